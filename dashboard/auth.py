@@ -30,7 +30,7 @@ def login(user):
 
 def _load_user_model():
     email = st.session_state.user
-    st.session_state.user_model = Person.find_one(emails=email)
+    st.session_state.user_model = Person.from_email(email)
 
 
 def current_user_model() -> Person:
@@ -38,7 +38,7 @@ def current_user_model() -> Person:
 
     if "user_model" in st.session_state:
         user: Person = st.session_state.user_model
-        if user.emails[0] != st.session_state.user:
+        if user is None or st.session_state.user not in user.emails:
             _load_user_model()
     else:
         _load_user_model()
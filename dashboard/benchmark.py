@@ -0,0 +1,210 @@
+"""
+Micro benchmarks of the data layer.
+
+Usage: python dashboard/benchmark.py <name>
+"""
+
+import sys
+import time
+
+import yaml
+from models.custom_model import DB_CLIENT, YAML_DATA_PATH, collection_names
+from models.db_clients.yaml_db_client import YamlDBClient
+
+
+def _timeit(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def yaml_engines():
+    """
+    Full load of every collection in the YAML tree with each available YAML
+    engine, always starting from a cold cache.
+    """
+    engines = {"python": (yaml.SafeLoader, yaml.SafeDumper)}
+    if yaml.__with_libyaml__:
+        engines["libyaml"] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+    coll_names = sorted(set(collection_names.values()))
+    print(f"{'engine':<10}{'documents':>12}{'cold load':>12}")
+
+    for engine, (loader, dumper) in engines.items():
+        count = 0
+
+        def load_all():
+            nonlocal count
+            client = YamlDBClient(YAML_DATA_PATH, loader=loader, dumper=dumper)
+            try:
+                count = sum(len(client.all(coll_name)) for coll_name in coll_names)
+            finally:
+                client.close()
+
+        elapsed = _timeit(load_all)
+        print(f"{engine:<10}{count:>12}{elapsed * 1000:>10.1f}ms")
+
+
+def attribute_access():
+    """
+    Cost of reading model attributes: plain and ref fields one by one, and as
+    used by sort keys and `format()` of every journal paper.
+    """
+    from models import JournalPaper
+    from models.custom_model import identity_scope
+
+    with identity_scope():
+        papers = JournalPaper.all(prefetch=["authors", "journal"])
+        paper = papers[0]
+        reads = 100_000
+
+        def plain_reads():
+            for _ in range(reads):
+                paper.title
+
+        def ref_reads():
+            for _ in range(reads):
+                paper.journal
+
+        cases = {
+            "plain field": (plain_reads, reads),
+            "ref field": (ref_reads, reads),
+            "sort key": (lambda: sorted(papers, key=lambda p: p.title), 1),
+            "format()": (lambda: [p.format() for p in papers], 1),
+        }
+
+        print(f"{'case':<14}{'time':>14}")
+        for case, (func, count) in cases.items():
+            elapsed = _timeit(func) / count
+            if count > 1:
+                print(f"{case:<14}{elapsed * 1e9:>12.1f}ns")
+            else:
+                print(f"{case:<14}{elapsed * 1e6:>12.1f}us")
+
+
+def _generic_encode(model) -> dict:
+    """
+    Encoding through `dict()` and `jsonable_encoder`, as `CustomModel.encode`
+    did before having an encoder per field.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from models.custom_model import Ref, RefList
+    from pydantic import HttpUrl
+
+    _dict = model.dict()
+    for key, value in _dict.items():
+        if isinstance(value, Ref):
+            _dict[key] = value.uuid
+        elif isinstance(value, RefList):
+            _dict[key] = value.uuids
+
+    result = {}
+    for key, value in jsonable_encoder(_dict).items():
+        if isinstance(value, dict) and "uuid" in value:
+            result[key] = value["uuid"]
+        elif isinstance(value, list) and all(
+            isinstance(v, dict) and "uuid" in v for v in value
+        ):
+            result[key] = [v["uuid"] for v in value]
+        elif isinstance(value, HttpUrl):
+            result[key] = str(value)
+        else:
+            result[key] = value
+    return result
+
+
+def encoders():
+    """
+    Encoding of every entry of every collection with the per field encoders
+    of `CustomModel.encode` and with the generic encoding. Both must give the
+    same result.
+    """
+    print(f"{'model':<24}{'entries':>8}{'generic':>12}{'encode()':>12}")
+
+    for model_class in collection_names:
+        models = model_class.all()
+        for model in models:
+            assert model.encode() == _generic_encode(model), model.uuid
+
+        generic = _timeit(lambda: [_generic_encode(model) for model in models])
+        compiled = _timeit(lambda: [model.encode() for model in models])
+        print(
+            f"{model_class.__name__:<24}{len(models):>8}"
+            f"{generic * 1000:>10.2f}ms{compiled * 1000:>10.2f}ms"
+        )
+
+
+def loaders():
+    """
+    Loading of every entry of every collection with the trusted load used for
+    the database reads and with the validated one. Both must give the same
+    models.
+    """
+    print(f"{'model':<24}{'entries':>8}{'validated':>12}{'trusted':>12}")
+
+    for model_class in collection_names:
+        entries = DB_CLIENT.all(model_class.coll_name())
+        for entry in entries:
+            trusted = model_class.load(entry)
+            validated = model_class.load(entry, trusted=False)
+            assert trusted.encode() == validated.encode(), entry["uuid"]
+
+        validated = _timeit(
+            lambda: [model_class.load(entry, trusted=False) for entry in entries]
+        )
+        trusted = _timeit(lambda: [model_class.load(entry) for entry in entries])
+        print(
+            f"{model_class.__name__:<24}{len(entries):>8}"
+            f"{validated * 1000:>10.2f}ms{trusted * 1000:>10.2f}ms"
+        )
+
+
+def row_views():
+    """
+    Time and peak memory of listing persons and theses as models and as row
+    views, reading the fields used by the listing pages.
+    """
+    import tracemalloc
+
+    from models import Person, Thesis
+
+    listings = {
+        Person: lambda p: (p.name, p.institution, p.faculty, p.department),
+        Thesis: lambda t: (t.title, t.advisors),
+    }
+
+    print(f"{'listing':<20}{'time':>12}{'peak memory':>14}")
+    for model_class, read in listings.items():
+        for view in (False, True):
+
+            def listing():
+                return [read(row) for row in model_class.all(view=view)]
+
+            DB_CLIENT.all(model_class.coll_name())
+            elapsed = _timeit(listing)
+            tracemalloc.start()
+            listing()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            name = model_class.__name__ + (" views" if view else " models")
+            print(f"{name:<20}{elapsed * 1000:>10.2f}ms{peak / 1024:>12.1f}kB")
+
+
+BENCHMARKS = {
+    "yaml": yaml_engines,
+    "attrs": attribute_access,
+    "encode": encoders,
+    "load": loaders,
+    "views": row_views,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python dashboard/benchmark.py [{'|'.join(BENCHMARKS)}]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]]()
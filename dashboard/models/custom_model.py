@@ -1,52 +1,101 @@
 from __future__ import annotations
 
+import atexit
+import logging
 import os
+import threading
+from contextlib import contextmanager
+from datetime import date
 from inspect import isclass
 from pathlib import Path
-from typing import Any, Generic, List, Optional, TypeVar
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 from uuid import UUID, uuid4
 
 from fastapi.encoders import jsonable_encoder
 from models.db_clients.combined_db_client import CombinedDBClient
-from models.db_clients.db_client import DBClient
+from models.db_clients.db_client import DBClient, DuplicateKeyError
 from models.db_clients.mongo_db_client import MongoDBClient
+from models.db_clients.packed_db_client import PackedDBClient
 from models.db_clients.yaml_db_client import YamlDBClient
+from models.reference_index import ReferenceIndex
 from numpy import delete
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import AnyUrl, BaseModel, Field, HttpUrl, PrivateAttr, ValidationError
 from pydantic.class_validators import Validator
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
 from typing_extensions import Self
 
+logger = logging.getLogger(__name__)
+
 DB_ROOT_USER = os.environ["DB_ROOT_USER"]
 DB_ROOT_PASS = os.environ["DB_ROOT_PASS"]
 USING_MONGO = (
     os.environ["USE_MONGO"] != "" and DB_ROOT_USER != "" and DB_ROOT_PASS != ""
 )
+USING_PACKED = os.environ.get("USE_PACKED", "") != ""
+
+YAML_DATA_PATH = Path("/src/data/")
+PACKED_DATA_PATH = Path("/src/data/packed/")
 
 # Contains the collection name for every custom model.
 # The names are filled using the `collection_name` decorator.
 collection_names = {}
 
+# Contains the secondary indexes declared for every custom model as pairs
+# (fields, unique). The indexes are filled using the `indexed` decorator.
+collection_indexes: Dict[type, List[Tuple[Tuple[str, ...], bool]]] = {}
+
+# Contains the natural keys of every custom model, fields whose values can
+# not be repeated by two entries. The keys are filled using the
+# `unique_together` decorator.
+collection_unique_keys: Dict[type, List[Tuple[str, ...]]] = {}
+
+# Indexes that could not be created as declared in the last call to
+# `create_indexes`, as (collection, fields) -> reason
+index_problems: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+_indexes_created = False
+_indexes_lock = threading.Lock()
+
 # All database clients
 clients: List[DBClient] = [
-    YamlDBClient(Path("/src/data/")),
+    PackedDBClient(PACKED_DATA_PATH) if USING_PACKED else YamlDBClient(YAML_DATA_PATH),
 ]
 
 if USING_MONGO:
     clients.append(MongoDBClient(DB_ROOT_USER, DB_ROOT_PASS))
 
-DB_CLIENT = CombinedDBClient(clients, use=1 if USING_MONGO else 0)
+DB_CLIENT = CombinedDBClient(clients, use=1 if USING_MONGO else 0, fan_out=True)
+atexit.register(DB_CLIENT.flush)
+
+# Entries that reference every entry (see `CustomModel.referencing`)
+REFERENCES = ReferenceIndex(DB_CLIENT)
 
 ModelT = TypeVar("ModelT", bound="CustomModel")
 
+# Identity map of the current thread (see `identity_scope`)
+_identity = threading.local()
+
 
 def with_refs(model_class: ModelT) -> ModelT:
     """
     Decorator that adds pydantic validators for all the Ref[T] and RefList[T]
     fields in a CustomModel.
     """
-    fields = model_class.__fields__
-    for field_name, field in fields.items():
-        if isclass(field.type_) and issubclass(field.type_, Ref):
+    for field_name, (ref_type, _) in model_class.__ref_fields__.items():
+        field = model_class.__fields__[field_name]
+        if ref_type is Ref:
 
             # Function that returns a validator for a Ref[T] field
             def _ref_val_wrapper(field):
@@ -61,7 +110,7 @@ def with_refs(model_class: ModelT) -> ModelT:
                 _ref_val_wrapper(field), pre=True
             )
 
-        elif isclass(field.type_) and issubclass(field.type_, RefList):
+        else:
 
             # Function that returns a validator for a RefList[T] field
             def _reflist_val_wrapper(field):
@@ -94,6 +143,137 @@ def collection_name(coll_name: str):
     return collection_name_deco
 
 
+def indexed(*fields: str, unique: bool = False):
+    """
+    Decorator that declares a secondary index over the given fields.
+
+    The indexes are inherited, so an index declared in a base model is created
+    in the collections of all its subclasses.
+    """
+
+    def indexed_deco(model_class: ModelT) -> ModelT:
+        collection_indexes.setdefault(model_class, []).append((fields, unique))
+        return model_class
+
+    return indexed_deco
+
+
+def unique_together(*fields: str):
+    """
+    Decorator that declares a natural key: two entries can not have the same
+    values in all the given fields. Saving a new entry with the values of an
+    existing one updates the existing one instead.
+
+    The key is backed by an unique index over the fields (see `indexed`).
+    """
+
+    def unique_together_deco(model_class: ModelT) -> ModelT:
+        collection_unique_keys.setdefault(model_class, []).append(fields)
+        return indexed(*fields, unique=True)(model_class)
+
+    return unique_together_deco
+
+
+def model_indexes(model_class: type) -> List[Tuple[Tuple[str, ...], bool]]:
+    """
+    Returns the indexes of a model as pairs (fields, unique): an unique `uuid`
+    index and the ones declared with `indexed` in the model and its bases.
+    """
+    indexes = [(("uuid",), True)]
+    for base in reversed(model_class.__mro__):
+        indexes.extend(collection_indexes.get(base, []))
+    return indexes
+
+
+def create_indexes():
+    """
+    Creates in the database clients the indexes of every model with a
+    collection. Creating an index that already exists does nothing.
+
+    Errors (e.g. the database is not up yet, or an unique index over
+    repeated values) do not stop the rest of the indexes, they are logged
+    and kept in `index_problems`.
+    """
+    problems = {}
+    for model_class, coll_name in collection_names.items():
+        for fields, unique in model_indexes(model_class):
+            try:
+                DB_CLIENT.create_index(coll_name, list(fields), unique=unique)
+            except Exception as e:
+                logger.exception("Could not create index %s in %s", fields, coll_name)
+                problems[(coll_name, fields)] = str(e)
+
+    with _indexes_lock:
+        index_problems.clear()
+        index_problems.update(problems)
+
+
+def ensure_indexes():
+    """
+    Creates the indexes (see `create_indexes`) the first time it is called
+    in the process. Meant to be called when the app starts.
+    """
+    global _indexes_created
+    with _indexes_lock:
+        if _indexes_created:
+            return
+        _indexes_created = True
+    create_indexes()
+
+
+def encode_query(value: Any) -> Any:
+    """
+    Encodes the values of a query as they are stored (e.g. models by uuid).
+    """
+    if isinstance(value, CustomModel):
+        return str(value.uuid)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (list, tuple, set)):
+        return [encode_query(v) for v in value]
+    if isinstance(value, dict):
+        return {key: encode_query(v) for key, v in value.items()}
+    return value
+
+
+def preload(*models: type):
+    """
+    Loads the collections of the given models at once, so the following reads
+    of those models do not hit the storage one collection at a time.
+    """
+    DB_CLIENT.preload([model_class.coll_name() for model_class in models])
+
+
+@contextmanager
+def identity_scope():
+    """
+    Context in which every entry read from the database, by key
+    (collection, uuid), resolves to a single model instance.
+
+    The instances are reused by the following reads and by the Ref and
+    RefList fields until the scope ends, so the page router opens one per
+    rerun. Saving a model makes it the instance of its entry and deleting it
+    removes the entry.
+    """
+    previous = getattr(_identity, "models", None)
+    _identity.models = {}
+    try:
+        yield
+    finally:
+        _identity.models = previous
+
+
+def _identity_models() -> Optional[Dict[Tuple[str, str], CustomModel]]:
+    return getattr(_identity, "models", None)
+
+
+def _identity_get(model_type: type, uuid: Any) -> Optional[CustomModel]:
+    models = _identity_models()
+    if models is None:
+        return None
+    return models.get((model_type.coll_name(), str(uuid)))
+
+
 class Ref(Generic[ModelT]):
     """
     Represents a reference to a custom model.
@@ -110,16 +290,40 @@ class Ref(Generic[ModelT]):
         self.cache: Optional[ModelT] = cache
 
     def _load_yaml(self) -> ModelT:
-        if self.cache is not None:
-            return self.cache
-        return self.model_type.get(str(self.uuid))
+        model = _identity_get(self.model_type, self.uuid)
+        if model is None:
+            model = self.cache
+        if model is None:
+            model = self.model_type.get(str(self.uuid))
+        self.cache = model
+        return model
 
     def load(self) -> ModelT:
         return self._load_yaml()
 
+    def missing(self) -> List[UUID]:
+        """
+        Returns the uuid if it is not loaded yet.
+        """
+        if self.cache is not None:
+            return []
+        if _identity_get(self.model_type, self.uuid) is not None:
+            return []
+        return [self.uuid]
+
+    def fill(self, loaded: Dict[str, ModelT]):
+        if self.cache is None:
+            self.cache = loaded.get(str(self.uuid))
+
     def clear_cache(self):
         self.cache = None
 
+    def detached(self) -> Ref[ModelT]:
+        """
+        Returns a new reference to the same entry, without the loaded model.
+        """
+        return Ref(uuid=self.uuid, model_type=self.model_type)
+
 
 class RefList(Generic[ModelT]):
     """
@@ -145,111 +349,282 @@ class RefList(Generic[ModelT]):
     def load(self):
         return self._load_yaml()
 
+    def detached(self) -> RefList[ModelT]:
+        """
+        Returns a new reference to the same entries, without the loaded models.
+        """
+        return RefList(uuids=list(self.uuids), model_type=self.model_type)
+
+    def missing(self) -> List[UUID]:
+        """
+        Returns the uuids that are not loaded yet.
+        """
+        return [
+            uuid
+            for uuid, cached in zip(self.uuids, self.cache)
+            if cached is None and _identity_get(self.model_type, uuid) is None
+        ]
+
+    def fill(self, loaded: Dict[str, ModelT]):
+        for i, uuid in enumerate(self.uuids):
+            if self.cache[i] is None:
+                self.cache[i] = loaded.get(str(uuid))
+
     def _load_yaml_at(self, idx) -> ModelT:
-        cached = self.cache[idx]
-        if cached is not None:
-            return cached
-        val = self.cache[idx] = self.model_type.get(str(self.uuids[idx]))
-        return val
+        model = _identity_get(self.model_type, self.uuids[idx])
+        if model is None:
+            model = self.cache[idx]
+        if model is None:
+            model = self.model_type.get(str(self.uuids[idx]))
+        self.cache[idx] = model
+        return model
 
     def _load_yaml(self) -> List[ModelT]:
+        missing = self.missing()
+        if missing:
+            models = self.model_type.get_many([str(uuid) for uuid in missing])
+            self.fill({str(model.uuid): model for model in models})
         return [self._load_yaml_at(i) for i in range(len(self.uuids))]
 
 
+# Values stored as they are
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _encode_any(value: Any) -> Any:
+    """
+    Generic encoding of a field value to its storage format.
+    """
+    if isinstance(value, Ref):
+        return jsonable_encoder(value.uuid)
+    if isinstance(value, RefList):
+        return jsonable_encoder(value.uuids)
+
+    value = jsonable_encoder(value)
+    if isinstance(value, dict) and "uuid" in value:
+        return value["uuid"]
+    if isinstance(value, list) and all(
+        isinstance(v, dict) and "uuid" in v for v in value
+    ):
+        return [v["uuid"] for v in value]
+    if isinstance(value, HttpUrl):
+        return str(value)
+    return value
+
+
+def _encode_scalar(value: Any) -> Any:
+    return value if type(value) in SCALAR_TYPES else _encode_any(value)
+
+
+def _encode_scalar_list(value: Any) -> Any:
+    if type(value) is list and all(type(v) in SCALAR_TYPES for v in value):
+        return list(value)
+    return _encode_any(value)
+
+
+def _encode_str(value: Any) -> Any:
+    # UUIDs and URLs
+    return None if value is None else str(value)
+
+
+def _encode_date(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, date) else _encode_any(value)
+
+
+def _encode_ref(value: Any) -> Any:
+    if value is None:
+        return None
+    return str(value.uuid) if isinstance(value, Ref) else _encode_any(value)
+
+
+def _encode_ref_list(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, RefList):
+        return [str(uuid) for uuid in value.uuids]
+    return _encode_any(value)
+
+
+def _field_encoder(field: ModelField, ref_type: Optional[type]) -> Callable[[Any], Any]:
+    if ref_type is not None:
+        return _encode_ref if ref_type is Ref else _encode_ref_list
+
+    type_ = field.type_
+    if not isclass(type_):
+        return _encode_any
+    if field.shape == SHAPE_LIST and issubclass(type_, SCALAR_TYPES):
+        return _encode_scalar_list
+    if field.shape != SHAPE_SINGLETON:
+        return _encode_any
+    if issubclass(type_, (UUID, AnyUrl)):
+        return _encode_str
+    if issubclass(type_, date):
+        return _encode_date
+    if issubclass(type_, SCALAR_TYPES):
+        return _encode_scalar
+    return _encode_any
+
+
+def _decode_uuid(value: Any) -> Any:
+    return UUID(value) if isinstance(value, str) else value
+
+
+def _decode_date(value: Any) -> Any:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _decode_list(value: Any) -> Any:
+    # The stored list may be shared with the cache of the client
+    return list(value) if type(value) is list else value
+
+
+def _field_decoder(
+    model_class: type, name: str, field: ModelField
+) -> Optional[Callable[[Any], Any]]:
+    """
+    Returns the function that converts a stored value of a field to its model
+    value without a full validation, or None if the value is kept as stored.
+    """
+    ref_type, model_type = model_class.__ref_fields__.get(name, (None, None))
+    if ref_type is Ref:
+        return lambda value: (
+            None if value is None else Ref(_decode_uuid(value), model_type)
+        )
+    if ref_type is RefList:
+        return lambda value: (
+            None
+            if value is None
+            else RefList([_decode_uuid(val) for val in value], model_type)
+        )
+
+    type_ = field.type_
+    if isclass(type_) and field.shape == SHAPE_SINGLETON:
+        if issubclass(type_, UUID):
+            return _decode_uuid
+        if issubclass(type_, date):
+            return _decode_date
+    if isclass(type_) and issubclass(type_, SCALAR_TYPES):
+        # URLs are str too, but they are validated
+        if not issubclass(type_, AnyUrl):
+            if field.shape == SHAPE_SINGLETON:
+                return None
+            if field.shape == SHAPE_LIST:
+                return _decode_list
+
+    # Anything else (e.g. URLs) is validated by pydantic
+    def validate(value: Any) -> Any:
+        value, errors = field.validate(value, {}, loc=name, cls=model_class)
+        if errors:
+            raise ValidationError([errors], model_class)
+        return value
+
+    return validate
+
+
 class CustomModel(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
+    # Ref and RefList fields of the model: name -> (Ref or RefList, T)
+    __ref_fields__: ClassVar[Dict[str, Tuple[type, type]]] = {}
+
+    # Attributes that need special handling when read: name -> (field name,
+    # whether the ref must be loaded). A ref field `x` is loaded when read as
+    # `x`, and `x_ref` returns the field itself.
+    __ref_attrs__: ClassVar[Dict[str, Tuple[str, bool]]] = {}
+
+    # Encoder of every field, see `encode`
+    __encoders__: ClassVar[Optional[Dict[str, Callable[[Any], Any]]]] = None
+
+    # Decoder of the fields whose stored values need a conversion, see `load`
+    __decoders__: ClassVar[Optional[Dict[str, Callable[[Any], Any]]]] = None
+
     uuid: UUID = Field(default_factory=uuid4)
 
+    # Entry as it was read from the database, to know what changed since then
+    _baseline: Optional[dict] = PrivateAttr(default=None)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls.__ref_fields__ = {}
+        cls.__ref_attrs__ = {}
+        for name, field in cls.__fields__.items():
+            cls.__ref_attrs__[name + "_ref"] = (name, False)
+            if isclass(field.type_) and issubclass(field.type_, (Ref, RefList)):
+                ref_type = Ref if issubclass(field.type_, Ref) else RefList
+                cls.__ref_fields__[name] = (ref_type, field.annotation.__args__[0])
+                cls.__ref_attrs__[name] = (name, True)
+
     def __getattribute__(self, name: str) -> Any:
-        # If dundler method return default
-        if name.startswith("__"):
-            return super().__getattribute__(name)
-
-        # Check is asking for ref directly
-        return_ref = name.endswith("_ref")
-        if return_ref:
-            # If so, fix the attr name to the correct field name
-            name = name[:-4]
-
-        model_field = self.__class__.__fields__.get(name, None)
-        if model_field is not None:
-            is_ref_field = isclass(model_field.type_) and issubclass(
-                model_field.type_, (Ref, RefList)
-            )
-            if is_ref_field and not return_ref:
-                ref = super().__getattribute__(name)
-                return None if ref is None else ref.load()
+        ref_attr = type(self).__ref_attrs__.get(name)
+        if ref_attr is None:
+            # Plain fields, methods, dunder attributes...
+            return object.__getattribute__(self, name)
 
-        return super().__getattribute__(name)
+        field_name, load = ref_attr
+        value = object.__getattribute__(self, field_name)
+        if load and value is not None:
+            return value.load()
+        return value
 
     def __setattr__(self, name, value):
-        if value is None:
+        ref_field = type(self).__ref_fields__.get(name)
+        if ref_field is None or value is None:
             return super().__setattr__(name, value)
 
-        model_field = self.__class__.__fields__.get(name, None)
-        if model_field is not None:
-            # Create a Ref or a RefList if field is a ref.
-            if isclass(model_field.type_) and issubclass(model_field.type_, Ref):
-                assert isinstance(
-                    value, CustomModel
-                ), "Only custom models can be assigned to Ref fields"
-
-                model_type = model_field.annotation.__args__[0]
-                return super().__setattr__(
-                    name,
-                    Ref(uuid=value.uuid, model_type=model_type, cache=value),
-                )
-            if isclass(model_field.type_) and issubclass(model_field.type_, RefList):
-                assert isinstance(
-                    value, list
-                ), "Only lists can be assigned to RefList fields"
-                assert all(
-                    isinstance(val, CustomModel) for val in value
-                ), "All elements in the list must be custom models"
-
-                model_type = model_field.annotation.__args__[0]
-                ref = RefList(
-                    uuids=[val.uuid for val in value],
-                    model_type=model_type,
-                    cache=value,
-                )
-                return super().__setattr__(name, ref)
+        # Create a Ref or a RefList if field is a ref. Views are referenced by
+        # uuid, the model is loaded when the field is read.
+        ref_type, model_type = ref_field
+        if ref_type is Ref:
+            assert isinstance(
+                value, (CustomModel, RowView)
+            ), "Only custom models can be assigned to Ref fields"
+
+            cache = value if isinstance(value, CustomModel) else None
+            return super().__setattr__(
+                name,
+                Ref(uuid=value.uuid, model_type=model_type, cache=cache),
+            )
 
-        return super().__setattr__(name, value)
+        assert isinstance(value, list), "Only lists can be assigned to RefList fields"
+        assert all(
+            isinstance(val, (CustomModel, RowView)) for val in value
+        ), "All elements in the list must be custom models"
+
+        ref = RefList(
+            uuids=[val.uuid for val in value],
+            model_type=model_type,
+            cache=[val if isinstance(val, CustomModel) else None for val in value],
+        )
+        return super().__setattr__(name, ref)
 
     def check(self):
         return True
 
-    def encode(self) -> dict:
-        _dict = self.dict()
-
-        # Check for ref fields and replace them by their id (or id list).
-        result = {}
-        for key, value in _dict.items():
-            if isinstance(value, Ref):
-                result[key] = value.uuid
-            elif isinstance(value, RefList):
-                result[key] = value.uuids
-        _dict.update(result)
-
-        data = jsonable_encoder(_dict)
-        result = {}
-
-        for key, value in data.items():
-            if isinstance(value, dict) and "uuid" in value:
-                result[key] = value["uuid"]
-            elif isinstance(value, list) and all(
-                isinstance(v, dict) and "uuid" in v for v in value
-            ):
-                result[key] = [v["uuid"] for v in value]
-            elif isinstance(value, HttpUrl):
-                result[key] = str(value)
-            else:
-                result[key] = value
+    @classmethod
+    def _encoders(cls) -> Dict[str, Callable[[Any], Any]]:
+        # Built on first use, when the forward references are already solved
+        encoders = cls.__dict__.get("__encoders__")
+        if encoders is None:
+            encoders = {
+                name: _field_encoder(field, cls.__ref_fields__.get(name, (None,))[0])
+                for name, field in cls.__fields__.items()
+            }
+            cls.__encoders__ = encoders
+        return encoders
 
-        return result
+    def encode(self) -> dict:
+        """
+        Returns the model as it is stored: refs by uuid and every value as a
+        JSON compatible type. Each field is encoded by a function chosen from
+        its type.
+        """
+        encoders = type(self)._encoders()
+        return {
+            key: encoders.get(key, _encode_any)(value)
+            for key, value in self.__dict__.items()
+        }
 
     def _encode(self, v):
         if isinstance(v, (int, float, str)):
@@ -271,9 +646,72 @@ class CustomModel(BaseModel):
         return coll_name
 
     def save(self):
+        """
+        Saves the model. Models read from the database only send the fields
+        that changed since they were read, and nothing if none did.
+        """
         coll_name = self.__class__.coll_name()
         data = self.encode()
-        DB_CLIENT.save(coll_name, data)
+
+        self._use_existing_uuid(data)
+        try:
+            self._save_data(coll_name, data)
+        except DuplicateKeyError:
+            # Another entry with the same natural key was stored since it was
+            # looked up, update that one instead
+            if not self._use_existing_uuid(data):
+                raise
+            self._save_data(coll_name, data)
+
+        if self.__ref_fields__:
+            REFERENCES.update(coll_name, data, self.__ref_fields__)
+
+        models = _identity_models()
+        if models is not None:
+            models[(coll_name, str(self.uuid))] = self
+
+    def _save_data(self, coll_name: str, data: dict):
+        baseline = self._baseline
+        if baseline is not None and baseline.get("uuid") == data["uuid"]:
+            fields = [
+                key
+                for key, value in data.items()
+                if key not in baseline or baseline[key] != value
+            ]
+            if fields:
+                DB_CLIENT.save(coll_name, data, fields=fields)
+        else:
+            DB_CLIENT.save(coll_name, data)
+        self._baseline = data
+
+    @classmethod
+    def _unique_keys(cls) -> List[Tuple[str, ...]]:
+        return [
+            fields
+            for base in reversed(cls.__mro__)
+            for fields in collection_unique_keys.get(base, [])
+        ]
+
+    def _use_existing_uuid(self, data: dict) -> bool:
+        """
+        Takes the uuid of the stored entry with the same natural key, if any,
+        so saving updates it instead of adding a duplicate. Returns True if
+        the uuid changed.
+
+        An entry that is one of several with the same key (stored before the
+        key was declared) keeps its own uuid.
+        """
+        for fields in self._unique_keys():
+            query = {field: data.get(field) for field in fields}
+            uuids = [
+                str(existing["uuid"])
+                for existing in DB_CLIENT.find(self.__class__.coll_name(), **query)
+            ]
+            if uuids and data["uuid"] not in uuids:
+                self.uuid = UUID(uuids[0])
+                data["uuid"] = uuids[0]
+                return True
+        return False
 
     @classmethod
     def stats(cls) -> dict:
@@ -281,48 +719,239 @@ class CustomModel(BaseModel):
         return DB_CLIENT.stats(coll_name)
 
     @classmethod
-    def all(cls) -> List[Self]:
+    def index_stats(cls) -> List[dict]:
+        coll_name = cls.coll_name()
+        return DB_CLIENT.index_stats(coll_name)
+
+    @classmethod
+    def all(cls, prefetch: Sequence[str] = (), view: bool = False) -> List[Self]:
+        """
+        Returns all the entries. The Ref and RefList fields named in
+        `prefetch` are loaded for all of them at once (see `prefetch`).
+
+        With `view`, the entries are returned as read-only `RowView`s instead
+        of models (`prefetch` does not apply to them). The views are shared by
+        all the sessions of the process until the collection changes (see
+        `SnapshotCache`).
+        """
+        if view:
+            return SNAPSHOTS.rows(cls)
+
         coll_name = cls.coll_name()
         entries = DB_CLIENT.all(coll_name)
-        return [cls.load(entry) for entry in entries]
+        models = [cls._from_db(entry) for entry in entries]
+        cls.prefetch(models, *prefetch)
+        return models
 
     @classmethod
-    def find(cls, **kwargs) -> List[Self]:
+    def find(
+        cls, prefetch: Sequence[str] = (), view: bool = False, **kwargs
+    ) -> List[Self]:
+        """
+        Returns the entries that match the given field values. Besides plain
+        values, fields accept query operators, e.g.:
+
+            JournalPaper.find(year={"$in": [2021, 2022]})
+            JournalPaper.find(authors={"$contains": person})
+
+        `prefetch` and `view` work as in `all`.
+        """
         coll_name = cls.coll_name()
-        entries = DB_CLIENT.find(coll_name, **kwargs)
-        return [cls.load(entry) for entry in entries]
+        entries = DB_CLIENT.find(coll_name, **encode_query(kwargs))
+        if view:
+            return [RowView(cls, entry) for entry in entries]
+
+        models = [cls._from_db(entry) for entry in entries]
+        cls.prefetch(models, *prefetch)
+        return models
 
     @classmethod
-    def find_one(cls, **kwargs) -> Self:
+    def iter(
+        cls, batch_size: int = 100, prefetch: Sequence[str] = (), **kwargs
+    ) -> Iterator[Self]:
+        """
+        Like `find`, but the entries are read from the database in batches and
+        loaded one at a time, so the whole result is never in memory. For the
+        same reason, the loaded models are not kept in the identity map.
+        """
         coll_name = cls.coll_name()
-        data = DB_CLIENT.find_one(coll_name, **kwargs)
-        return cls.load(data)
+        for batch in DB_CLIENT.iter(coll_name, batch_size, **encode_query(kwargs)):
+            models = [cls._from_db(entry, keep=False) for entry in batch]
+            cls.prefetch(models, *prefetch)
+            yield from models
 
     @classmethod
-    def get(cls, uuid: str) -> Self:
+    def find_one(cls, **kwargs) -> Self:
         coll_name = cls.coll_name()
-        data = DB_CLIENT.get(coll_name, uuid)
-        return cls.load(data)
+        data = DB_CLIENT.find_one(coll_name, **encode_query(kwargs))
+        return cls._from_db(data)
+
+    @classmethod
+    def get(cls, uuid: str, prefetch: Sequence[str] = ()) -> Self:
+        model = _identity_get(cls, uuid)
+        if model is None:
+            coll_name = cls.coll_name()
+            data = DB_CLIENT.get(coll_name, uuid)
+            model = cls._from_db(data)
+
+        cls.prefetch([model], *prefetch)
+        return model
+
+    @classmethod
+    def get_many(cls, uuids: List[str]) -> List[Self]:
+        """
+        Returns the entries with the given uuids that exist, in the same order,
+        reading all the ones that are not in the identity map at once.
+        """
+        found = {}
+        missing = []
+        for uuid in uuids:
+            model = _identity_get(cls, uuid)
+            if model is None:
+                missing.append(str(uuid))
+            else:
+                found[str(uuid)] = model
+
+        if missing:
+            for data in DB_CLIENT.get_many(cls.coll_name(), missing):
+                found[str(data["uuid"])] = cls._from_db(data)
+
+        return [found[str(uuid)] for uuid in uuids if str(uuid) in found]
+
+    @classmethod
+    def referencing(
+        cls, targets: List[Any], *fields: str, prefetch: Sequence[str] = ()
+    ) -> List[Self]:
+        """
+        Returns the entries that reference any of the targets (models or
+        uuids) in any of the given Ref and RefList fields, all of them if none
+        is given, e.g.:
+
+            Project.referencing([person], "members")
+
+        The entries are found through the reverse index of references, without
+        reading the whole collection.
+        """
+        uuids = REFERENCES.referencing(
+            cls.coll_name(),
+            cls.__ref_fields__,
+            [str(getattr(target, "uuid", target)) for target in targets],
+            fields or cls.__ref_fields__,
+        )
+        models = cls.get_many(uuids)
+        cls.prefetch(models, *prefetch)
+        return models
+
+    @classmethod
+    def prefetch(cls, models: List[CustomModel], *fields: str):
+        """
+        Loads the given Ref and RefList fields of several models at once, with
+        a single read for each referenced collection, e.g.:
+
+            JournalPaper.prefetch(papers, "authors", "journal")
+        """
+        refs_by_type: Dict[type, list] = {}
+        for field in fields:
+            for model in models:
+                ref = getattr(model, field + "_ref")
+                if ref is not None:
+                    refs_by_type.setdefault(ref.model_type, []).append(ref)
+
+        for model_type, refs in refs_by_type.items():
+            uuids = list({str(uuid) for ref in refs for uuid in ref.missing()})
+            if not uuids:
+                continue
+            loaded = {str(model.uuid): model for model in model_type.get_many(uuids)}
+            for ref in refs:
+                ref.fill(loaded)
+
+    @classmethod
+    def _from_db(cls, data: dict, keep: bool = True) -> Self:
+        """
+        Loads an entry read from the database, unless the identity map already
+        has an instance of it.
+        """
+        models = _identity_models()
+        if models is None:
+            return cls._load_baseline(data)
+
+        key = (cls.coll_name(), str(data["uuid"]))
+        model = models.get(key)
+        if model is None:
+            model = cls._load_baseline(data)
+            if keep:
+                models[key] = model
+        return model
+
+    @classmethod
+    def _load_baseline(cls, data: dict) -> Self:
+        model = cls.load(data)
+        model._baseline = data
+        return model
 
     def delete(self):
         coll_name = self.__class__.coll_name()
         DB_CLIENT.delete(coll_name, str(self.uuid))
+        REFERENCES.remove(coll_name, str(self.uuid))
+
+        models = _identity_models()
+        if models is not None:
+            models.pop((coll_name, str(self.uuid)), None)
+
+    @classmethod
+    def _decoders(cls) -> Dict[str, Callable[[Any], Any]]:
+        # Built on first use, when the forward references are already solved
+        decoders = cls.__dict__.get("__decoders__")
+        if decoders is None:
+            decoders = {}
+            for name, field in cls.__fields__.items():
+                decoder = _field_decoder(cls, name, field)
+                if decoder is not None:
+                    decoders[name] = decoder
+            cls.__decoders__ = decoders
+        return decoders
+
+    @classmethod
+    def load(cls, data: dict, trusted: bool = True) -> Self:
+        """
+        Builds a model from a stored entry.
+
+        Entries read from the database are trusted: their values are only
+        converted to the field types (uuids, dates, refs...) and the model is
+        built without running the pydantic validation. Entries from any other
+        source (e.g. imports) must be loaded with `trusted=False`.
+        """
+        if not trusted:
+            return cls._load_validated(data)
+
+        decoders = cls._decoders()
+        fields = cls.__fields__
+        values = {}
+        for key, value in data.items():
+            if key not in fields:
+                raise KeyError(key)
+            decoder = decoders.get(key)
+            values[key] = value if decoder is None else decoder(value)
+
+        return cls.construct(**values)
 
     @classmethod
-    def load(cls, data: dict) -> Self:
+    def _load_validated(cls, data: dict) -> Self:
         values = {}
 
         for key, value in data.items():
-            field = cls.__fields__[key]
+            if key not in cls.__fields__:
+                raise KeyError(key)
 
-            if isclass(field.type_) and issubclass(field.type_, Ref):
-                value = Ref(uuid=UUID(value), model_type=field.annotation.__args__[0])
+            ref_type, model_type = cls.__ref_fields__.get(key, (None, None))
+            if ref_type is Ref and value is not None:
+                value = Ref(uuid=UUID(value), model_type=model_type)
 
-            if isclass(field.type_) and issubclass(field.type_, RefList):
+            if ref_type is RefList:
                 assert isinstance(value, list)
                 value = RefList(
                     uuids=[UUID(val) for val in value],
-                    model_type=field.annotation.__args__[0],
+                    model_type=model_type,
                 )
 
             values[key] = value
@@ -333,4 +962,142 @@ class CustomModel(BaseModel):
         return hash(str(self.uuid))
 
     def __eq__(self, other):
-        return isinstance(other, CustomModel) and self.uuid == other.uuid
+        return isinstance(other, (CustomModel, RowView)) and self.uuid == other.uuid
+
+
+class RowView:
+    """
+    Read-only view of a stored entry, for listings that only read a few
+    fields of many entries.
+
+    Fields are decoded from the stored entry the first time they are read.
+    The models of ref fields are not kept in the view, they are taken from
+    the identity map (or read) every time. The methods of the model (e.g.
+    `format()`) can be used as long as they only read fields. Use `edit()` to
+    get the full model.
+    """
+
+    __slots__ = ("_model_type", "_data", "_values")
+
+    def __init__(self, model_type: type, data: dict):
+        object.__setattr__(self, "_model_type", model_type)
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_values", {})
+
+    def _field(self, name: str) -> Any:
+        values = self._values
+        if name in values:
+            return values[name]
+
+        model_type = self._model_type
+        if name in self._data:
+            decoder = model_type._decoders().get(name)
+            value = self._data[name]
+            if decoder is not None:
+                value = decoder(value)
+        else:
+            value = model_type.__fields__[name].get_default()
+
+        values[name] = value
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for the names that are not in the view itself
+        if name in RowView.__slots__:
+            raise AttributeError(name)
+
+        model_type = self._model_type
+        field_name, load = model_type.__ref_attrs__.get(name, (name, False))
+        if field_name in model_type.__fields__:
+            value = self._field(field_name)
+            if load and value is not None:
+                # Views can be shared, so they do not keep the loaded models
+                return value.detached().load()
+            return value
+
+        # Methods, properties and other descriptors of the model are bound to
+        # the view, as they would be to the model
+        attr = getattr(model_type, name)
+        get = getattr(type(attr), "__get__", None)
+        return attr if get is None else get(attr, self, model_type)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(
+            f"{self._model_type.__name__} views are read-only, use edit()"
+        )
+
+    def edit(self) -> CustomModel:
+        """
+        Returns the model of the entry.
+        """
+        return self._model_type._from_db(dict(self._data))
+
+    def encode(self) -> dict:
+        """
+        Returns the entry as stored, with the defaults of the missing fields.
+        """
+        data = self._data
+        encoders = self._model_type._encoders()
+        return {
+            name: data[name] if name in data else encoders[name](self._field(name))
+            for name in self._model_type.__fields__
+        }
+
+    def __str__(self) -> str:
+        if self._model_type.__str__ in (BaseModel.__str__, object.__str__):
+            return repr(self)
+        return self._model_type.__str__(self)
+
+    def __repr__(self) -> str:
+        return f"{self._model_type.__name__}View({self.uuid})"
+
+    def __hash__(self):
+        return hash(str(self.uuid))
+
+    def __eq__(self, other):
+        return isinstance(other, (CustomModel, RowView)) and self.uuid == other.uuid
+
+
+class SnapshotCache:
+    """
+    Row views of whole collections, shared by all the sessions and reruns of
+    the process, so concurrent users do not read the same collection once
+    each.
+
+    A snapshot is used while the version of its collection does not change
+    (see `DBClient.version`), every save or delete makes the next read take a
+    new one.
+    """
+
+    def __init__(self, db_client: DBClient):
+        self.db_client = db_client
+        self._snapshots: Dict[str, Tuple[Hashable, List[RowView]]] = {}
+        self._lock = threading.Lock()
+
+    def rows(self, model_type: type) -> List[RowView]:
+        """
+        Returns the views of all the entries of a model, in a new list.
+        """
+        coll_name = model_type.coll_name()
+        version = self.db_client.version(coll_name)
+        snapshot = self._snapshots.get(coll_name)
+
+        if snapshot is None or snapshot[0] != version:
+            with self._lock:
+                snapshot = self._snapshots.get(coll_name)
+                if snapshot is None or snapshot[0] != version:
+                    # The version is read before the entries, a write in
+                    # between only makes the next read take another snapshot
+                    entries = self.db_client.all(coll_name)
+                    views = [RowView(model_type, entry) for entry in entries]
+                    snapshot = self._snapshots[coll_name] = (version, views)
+
+        return list(snapshot[1])
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+# Shared views of the collections (see `CustomModel.all`)
+SNAPSHOTS = SnapshotCache(DB_CLIENT)
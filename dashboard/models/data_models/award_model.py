@@ -18,14 +18,13 @@ class Award(CustomModel):
 
     @classmethod
     def from_persons(cls, people: List[Person]):
-        persons_ids = {p.uuid for p in people}
-        for award in cls.all():
-            if award.awarded and set(award.participants_ref.uuids) & persons_ids:
+        for award in cls.referencing(people, "participants"):
+            if award.awarded:
                 yield award
 
     @classmethod
     def create(cls, key, obj=None):
-        people = Person.all()
+        people = Person.all(view=True)
         people.sort(key=lambda p: p.name)
 
         name = st.text_input("🔹Nombre del premio", key=f"{key}_award_name")
@@ -1,11 +1,18 @@
 from typing import List
 
-from models.custom_model import CustomModel, Ref, collection_name, with_refs
+from models.custom_model import (
+    CustomModel,
+    Ref,
+    collection_name,
+    unique_together,
+    with_refs,
+)
 from models.data_models.person_model import Person
 from models.data_models.subject_model import Subject
 
 
 @with_refs
+@unique_together("subject", "professor")
 @collection_name("classes")
 class Classes(CustomModel):
     subject: Ref[Subject]
@@ -15,15 +22,4 @@ class Classes(CustomModel):
 
     @classmethod
     def from_professors(cls, professors: List[Person]):
-        for _class in cls.all():
-            if _class.professor in professors:
-                yield _class
-
-    def save(self):
-        func_check_same_data = (
-            lambda c: self.subject == c.subject and self.professor == c.professor
-        )
-        class_with_same_data = next(filter(func_check_same_data, Classes.all()), None)
-        if class_with_same_data:
-            self.uuid = class_with_same_data.uuid
-        CustomModel.save(self)
+        yield from cls.referencing(professors, "professor")
@@ -2,9 +2,10 @@ from typing import List
 
 from pydantic import Field, HttpUrl
 
-from models.custom_model import CustomModel, collection_name
+from models.custom_model import CustomModel, collection_name, unique_together
 
 
+@unique_together("title", "publisher")
 @collection_name("journals")
 class Journal(CustomModel):
     title: str
@@ -13,15 +14,6 @@ class Journal(CustomModel):
     indices: List[str] = Field(default_factory=list)
     url: HttpUrl = None
 
-    def save(self):
-        func_check_same_data = (
-            lambda c: self.title == c.title and self.publisher == c.publisher
-        )
-        class_with_same_data = next(filter(func_check_same_data, Journal.all()), None)
-        if class_with_same_data:
-            self.uuid = class_with_same_data.uuid
-        CustomModel.save(self)
-
     def format(self):
         indices = ", ".join(f"_{index}_" for index in self.indices)
         title = f"**{self.title}**"
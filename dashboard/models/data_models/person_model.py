@@ -1,9 +1,55 @@
-from typing import List
+from typing import Dict, List, Optional
 
-from models.custom_model import CustomModel, collection_name
+from models.custom_model import DB_CLIENT, CustomModel, collection_name, indexed
+from models.db_clients.db_client import DBClient
+from models.reference_index import CollectionIndex
 from pydantic import Field
 
 
+class EmailIndex(CollectionIndex):
+    """
+    Email -> uuid of the person with that email, for every email of every
+    person (see `CollectionIndex`).
+    """
+
+    def __init__(self, db_client: DBClient):
+        super().__init__(db_client)
+        self._uuids: Dict[str, str] = {}
+        self._emails: Dict[str, List[str]] = {}
+
+    def _add(self, coll_name: str, data: dict):
+        uuid = str(data["uuid"])
+        self._emails[uuid] = list(data.get("emails") or [])
+        for email in self._emails[uuid]:
+            if email:
+                self._uuids.setdefault(email, uuid)
+
+    def _discard(self, coll_name: str, uuid: str):
+        for email in self._emails.pop(uuid, []):
+            if self._uuids.get(email) != uuid:
+                continue
+            del self._uuids[email]
+            # Another person with the same email takes it
+            for other_uuid, emails in self._emails.items():
+                if email in emails:
+                    self._uuids[email] = other_uuid
+                    break
+
+    def _clear(self, coll_name: str):
+        self._uuids = {}
+        self._emails = {}
+
+    def get(self, email: str) -> Optional[str]:
+        with self._lock:
+            self._build(Person.coll_name())
+            return self._uuids.get(email)
+
+
+# Person of every email (see `Person.from_email`)
+EMAILS = EmailIndex(DB_CLIENT)
+
+
+@indexed("emails")
 @collection_name("persons")
 class Person(CustomModel):
     name: str
@@ -41,10 +87,22 @@ class Person(CustomModel):
 
         return fmt
 
+    def save(self):
+        CustomModel.save(self)
+        EMAILS.update(Person.coll_name(), self.encode())
+
+    def delete(self):
+        CustomModel.delete(self)
+        EMAILS.remove(Person.coll_name(), str(self.uuid))
+
+    @classmethod
+    def from_email(cls, email: str) -> Optional["Person"]:
+        """
+        Returns the person with the given email, if any.
+        """
+        uuid = EMAILS.get(email)
+        return None if uuid is None else cls.get(uuid)
+
     @classmethod
     def own(cls):
-        return [
-            p
-            for p in cls.all()
-            if p.institution == "Universidad de La Habana" and p.faculty == "MatCom"
-        ]
+        return cls.find(institution="Universidad de La Habana", faculty="MatCom")
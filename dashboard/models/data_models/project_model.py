@@ -29,11 +29,7 @@ class Project(CustomModel):
 
     @classmethod
     def from_members(cls, people: List[Person]):
-        people = set(people)
-
-        for project in cls.all():
-            if set(project.members) & people:
-                yield project
+        yield from cls.referencing(people, "members")
 
     def format(self):
         lines = [f"⚗️ _{self.title}_"]
@@ -107,7 +103,7 @@ class Project(CustomModel):
             ).split("\n")
         ]
 
-        people = Person.all()
+        people = Person.all(view=True)
         people.sort(key=lambda p: p.name)
 
         head = st.selectbox(
@@ -1,17 +1,56 @@
-from typing import List
+from __future__ import annotations
 
-from models.custom_model import CustomModel, RefList, with_refs
+from typing import Dict, List, Sequence
+
+from models.custom_model import (
+    REFERENCES,
+    CustomModel,
+    RefList,
+    collection_names,
+    indexed,
+    with_refs,
+)
 from models.data_models.person_model import Person
 
 
 @with_refs
+@indexed("year")
 class Publication(CustomModel):
     authors: RefList[Person]
 
     @classmethod
-    def from_authors(cls, authors: List[Person]):
-        authors = set(authors)
+    def from_authors(cls, authors: List[Person], prefetch: Sequence[str] = ()):
+        yield from cls.referencing(authors, "authors", prefetch=prefetch)
+
+    @classmethod
+    def by_authors(
+        cls, authors: List[Person], prefetch: Sequence[str] = ()
+    ) -> Dict[type, List[Publication]]:
+        """
+        Returns the publications of the given authors grouped by type, for
+        every publication model. The Ref and RefList fields in `prefetch` are
+        loaded for the types that have them.
+        """
+        types = {
+            coll_name: model_class
+            for model_class, coll_name in collection_names.items()
+            if issubclass(model_class, cls)
+        }
+        uuids = REFERENCES.referencing_many(
+            {
+                coll_name: model_class.__ref_fields__
+                for coll_name, model_class in types.items()
+            },
+            [str(author.uuid) for author in authors],
+            ["authors"],
+        )
 
-        for item in cls.all():
-            if set(item.authors) & authors:
-                yield item
+        result = {}
+        for coll_name, model_class in types.items():
+            publications = model_class.get_many(uuids[coll_name])
+            model_class.prefetch(
+                publications,
+                *[field for field in prefetch if field in model_class.__ref_fields__],
+            )
+            result[model_class] = publications
+        return result
@@ -28,7 +28,7 @@ class ResearchGroup(CustomModel):
     def from_person(
         cls, person: Person
     ) -> Iterator[Tuple[ResearchGroup, ResearchGroupPersonStatus]]:
-        for group in cls.all():
+        for group in cls.referencing([person], "head", "members", "collaborators"):
             is_colaborator = person in group.collaborators
             is_member = person in group.members
             is_head = person == group.head
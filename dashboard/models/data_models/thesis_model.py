@@ -16,11 +16,8 @@ class Thesis(CustomModel):
 
     @classmethod
     def from_advisors(cls, advisors: List[Person]):
-        names = set([a.name for a in advisors])
-
-        for thesis in cls.all():
-            if set(thesis.advisors) & names:
-                yield thesis
+        names = [a.name for a in advisors]
+        yield from cls.iter(advisors={"$in": names})
 
     def check(self):
         if not self.title:
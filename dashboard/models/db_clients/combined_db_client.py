@@ -1,25 +1,130 @@
-from typing import List
+import logging
+import queue
+import threading
+import time
+from typing import Hashable, Iterator, List, Optional, Tuple
 
 from models.db_clients.db_client import DBClient
 
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter:
+    """
+    Applies the writes of a secondary client in a background thread.
+
+    Writes are taken in order from a bounded queue (callers block while it is
+    full) and retried with an exponential backoff before giving up.
+    """
+
+    def __init__(self, client: DBClient, queue_size: int, retries: int):
+        self.client = client
+        self.retries = retries
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, method: str, *args):
+        self.queue.put((method, args))
+
+    def _run(self):
+        while True:
+            method, args = self.queue.get()
+            try:
+                self._apply(method, args)
+            finally:
+                self.queue.task_done()
+
+    def _apply(self, method: str, args: tuple):
+        for attempt in range(self.retries + 1):
+            try:
+                getattr(self.client, method)(*args)
+                return
+            except Exception:
+                if attempt == self.retries:
+                    self.failed += 1
+                    logger.exception(
+                        "Giving up on %s in %s", method, type(self.client).__name__
+                    )
+                    return
+                time.sleep(0.1 * 2**attempt)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
 
 class CombinedDBClient(DBClient):
-    def __init__(self, clients: List[DBClient], use: int = 0):
+    """
+    Client that writes to several clients and reads from one of them.
+
+    With `fan_out` enabled, writes return as soon as the client in use has
+    applied them, the rest of the clients get them through background
+    writers. Use `flush` to wait for them.
+    """
+
+    def __init__(
+        self,
+        clients: List[DBClient],
+        use: int = 0,
+        fan_out: bool = False,
+        queue_size: int = 1000,
+        retries: int = 3,
+    ):
         if not clients:
             raise ValueError("There must be at least one client.")
         if not 0 <= use < len(clients):
             raise ValueError(f"Invalid client index ({use}) to use.")
 
+        super().__init__()
         self.clients = clients
         self.use = use
+        self.writers: List[BackgroundWriter] = []
+        if fan_out:
+            self.writers = [
+                BackgroundWriter(client, queue_size, retries)
+                for i, client in enumerate(clients)
+                if i != use
+            ]
 
     @property
     def client_in_use(self):
         return self.clients[self.use]
 
-    def save(self, coll_name: str, data: dict):
-        for client in self.clients:
-            client.save(coll_name, data)
+    def _write(self, method: str, *args):
+        # Writes the client in use rejects (e.g. a duplicated key) are not
+        # passed on to the rest
+        getattr(self.client_in_use, method)(*args)
+        if not self.writers:
+            for i, client in enumerate(self.clients):
+                if i != self.use:
+                    getattr(client, method)(*args)
+            return
+
+        for writer in self.writers:
+            writer.submit(method, *args)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the background writers applied all the pending writes.
+        Returns False if the timeout expired before.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for writer in self.writers:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not writer.flush(remaining):
+                return False
+        return True
+
+    def save(self, coll_name: str, data: dict, fields: Optional[List[str]] = None):
+        self._write("save", coll_name, data, fields)
 
     def get(self, coll_name: str, uuid: str) -> dict:
         return self.client_in_use.get(coll_name, uuid)
@@ -27,9 +132,23 @@ class CombinedDBClient(DBClient):
     def delete(self, coll_name: str, uuid: str):
         self.client_in_use.delete(coll_name, uuid)
 
+    def save_many(self, coll_name: str, docs: List[dict]):
+        self._write("save_many", coll_name, docs)
+
+    def get_many(self, coll_name: str, uuids: List[str]) -> List[dict]:
+        return self.client_in_use.get_many(coll_name, uuids)
+
+    def delete_many(self, coll_name: str, uuids: List[str]):
+        self.client_in_use.delete_many(coll_name, uuids)
+
     def find(self, coll_name: str, **kwargs) -> List[dict]:
         return self.client_in_use.find(coll_name, **kwargs)
 
+    def iter(
+        self, coll_name: str, batch_size: int = 100, **kwargs
+    ) -> Iterator[List[dict]]:
+        return self.client_in_use.iter(coll_name, batch_size, **kwargs)
+
     def find_one(self, coll_name: str, **kwargs) -> dict:
         return self.client_in_use.find_one(coll_name, **kwargs)
 
@@ -38,3 +157,29 @@ class CombinedDBClient(DBClient):
 
     def stats(self, coll_name: str) -> dict:
         return self.client_in_use.stats(coll_name)
+
+    def version(self, coll_name: str) -> Hashable:
+        return self.client_in_use.version(coll_name)
+
+    def last_write(
+        self, coll_name: str
+    ) -> Optional[Tuple[Optional[Hashable], Hashable]]:
+        return self.client_in_use.last_write(coll_name)
+
+    def create_index(self, coll_name: str, fields: List[str], unique: bool = False):
+        # A client that fails (e.g. is not up yet) does not keep the rest
+        # from getting the index
+        error = None
+        for client in self.clients:
+            try:
+                client.create_index(coll_name, fields, unique)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def index_stats(self, coll_name: str) -> List[dict]:
+        return self.client_in_use.index_stats(coll_name)
+
+    def preload(self, coll_names: List[str]):
+        self.client_in_use.preload(coll_names)
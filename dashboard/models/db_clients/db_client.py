@@ -1,11 +1,57 @@
 import abc
-from typing import List
+import threading
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class DuplicateKeyError(Exception):
+    """
+    Raised when a save would repeat the values of an unique index.
+    """
 
 
 class DBClient(abc.ABC):
+    def __init__(self):
+        # Versions around the last write to every collection, by thread
+        self._last_writes = threading.local()
+
     @abc.abstractmethod
-    def save(self, coll_name: str, data: dict):
-        pass
+    def version(self, coll_name: str) -> Hashable:
+        """
+        Returns the version of a collection, a value that changes every time
+        the collection is written, also by other processes that share the
+        storage. Anything read from the collection is up to date while its
+        version does not change. Versions are only meant to be compared for
+        equality, and should be cheap to get.
+        """
+
+    def last_write(
+        self, coll_name: str
+    ) -> Optional[Tuple[Optional[Hashable], Hashable]]:
+        """
+        Returns the versions of a collection right before and right after the
+        last write made through this client by the current thread. A cache
+        that was up to date with the first one only missed that write. The
+        first one is None when it is not known.
+        """
+        return getattr(self._last_writes, "versions", {}).get(coll_name)
+
+    def _record_write(
+        self, coll_name: str, before: Optional[Hashable], after: Hashable
+    ):
+        """
+        To be called by the clients after every write (see `last_write`).
+        """
+        if not hasattr(self._last_writes, "versions"):
+            self._last_writes.versions = {}
+        self._last_writes.versions[coll_name] = (before, after)
+
+    @abc.abstractmethod
+    def save(self, coll_name: str, data: dict, fields: Optional[List[str]] = None):
+        """
+        Saves a whole entry. If given, `fields` are the only fields that
+        changed since the entry was read, clients that can update single
+        fields only write those.
+        """
 
     @abc.abstractmethod
     def get(self, coll_name: str, uuid: str) -> dict:
@@ -17,7 +63,10 @@ class DBClient(abc.ABC):
 
     @abc.abstractmethod
     def find(self, coll_name: str, **kwargs) -> List[dict]:
-        pass
+        """
+        Returns the entries whose fields match the given values or operators
+        (see `models.db_clients.query`).
+        """
 
     @abc.abstractmethod
     def find_one(self, coll_name: str, **kwargs) -> dict:
@@ -30,3 +79,100 @@ class DBClient(abc.ABC):
     @abc.abstractmethod
     def stats(self, coll_name: str) -> dict:
         pass
+
+    @abc.abstractmethod
+    def save_many(self, coll_name: str, docs: List[dict]):
+        pass
+
+    @abc.abstractmethod
+    def get_many(self, coll_name: str, uuids: List[str]) -> List[dict]:
+        """
+        Returns the entries with the given uuids that exist, in the same order.
+        """
+
+    @abc.abstractmethod
+    def delete_many(self, coll_name: str, uuids: List[str]):
+        pass
+
+    def create_index(self, coll_name: str, fields: List[str], unique: bool = False):
+        """
+        Declares a secondary index over the given fields of a collection. Saves
+        that would repeat the values of an unique index raise
+        `DuplicateKeyError`.
+
+        Clients that cannot use indexes just ignore it.
+        """
+
+    def index_stats(self, coll_name: str) -> List[dict]:
+        """
+        Returns the fields of every index of a collection and how many times
+        it was used to answer a query.
+        """
+        return []
+
+    def iter(
+        self, coll_name: str, batch_size: int = 100, **kwargs
+    ) -> Iterator[List[dict]]:
+        """
+        Streams the entries that match the query in batches of at most
+        `batch_size` entries.
+
+        Clients that can not stream just split the result of `find`.
+        """
+        docs = self.find(coll_name, **kwargs)
+        for i in range(0, len(docs), batch_size):
+            yield docs[i : i + batch_size]
+
+    def preload(self, coll_names: List[str]):
+        """
+        Loads several collections at once, so the following reads are served
+        from memory.
+
+        Clients without an in-memory cache just ignore it.
+        """
+
+
+class CollectionVersions:
+    """
+    Versions of the collections a cache was read from, to tell when it must
+    be read again because someone (maybe another process) wrote them.
+    """
+
+    def __init__(self, db_client: DBClient):
+        self.db_client = db_client
+        self._versions: Dict[str, Hashable] = {}
+
+    def is_current(self, coll_name: str) -> bool:
+        return coll_name in self._versions and self._versions[
+            coll_name
+        ] == self.db_client.version(coll_name)
+
+    def loading(self, coll_name: str):
+        """
+        Records the version of a collection that is about to be read. It is
+        taken before reading, a write in between only causes another read.
+        """
+        self._versions[coll_name] = self.db_client.version(coll_name)
+
+    def written(self, coll_name: str) -> bool:
+        """
+        To be called after a write made through the client. Returns True if
+        the cache only missed that write, so it can apply it by itself, and
+        records the new version. Otherwise the collection must be read again.
+        """
+        version = self._versions.get(coll_name)
+        last_write = self.db_client.last_write(coll_name)
+        if version is not None and last_write is not None:
+            before, after = last_write
+            if version in (before, after):
+                self._versions[coll_name] = after
+                return True
+
+        self._versions.pop(coll_name, None)
+        return False
+
+    def forget(self, coll_name: Optional[str] = None):
+        if coll_name is None:
+            self._versions.clear()
+        else:
+            self._versions.pop(coll_name, None)
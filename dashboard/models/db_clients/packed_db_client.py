@@ -0,0 +1,431 @@
+"""
+Database client that stores every collection in a single JSON-lines file.
+
+Each save appends the whole document as a new line and each delete appends a
+tombstone, so the last line of an uuid is the current one. An offset index
+(uuid -> position of its last line) is built by scanning the file once and is
+used to read documents directly from a memory-mapped view of the file. When
+the superseded lines take more space than the live ones, the file is
+compacted in a background thread. Appends and compactions hold an exclusive
+lock on a `.lock` file next to the collection file, so several processes can
+share the data directory.
+
+The per-file YAML tree used by the git workflow can be imported with
+`import_yaml` and exported again with `export_yaml`.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from models.db_clients.db_client import DBClient, DuplicateKeyError
+from models.db_clients.query import (
+    HashIndex,
+    candidates,
+    check_unique,
+    has_duplicates,
+    matches,
+)
+from models.db_clients.yaml_db_client import YamlDBClient
+
+UUID_PREFIX = b'{"uuid":"'
+DELETED_SUFFIX = b',"$deleted":true}'
+
+# Minimum amount of superseded bytes before a collection is compacted
+COMPACT_MIN_BYTES = 64 * 1024
+
+
+def _encode(data: dict) -> bytes:
+    # The uuid goes first, so it can be read without decoding the line
+    record = {"uuid": None}
+    record.update(data)
+    record["uuid"] = str(record["uuid"])
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _tombstone(uuid: str) -> bytes:
+    return UUID_PREFIX + uuid.encode() + b'"' + DELETED_SUFFIX
+
+
+def _line_uuid(line: bytes) -> str:
+    if line.startswith(UUID_PREFIX):
+        return line[len(UUID_PREFIX) : line.index(b'"', len(UUID_PREFIX))].decode()
+    return str(json.loads(line)["uuid"])
+
+
+class PackedCollection:
+    """
+    Offset index and secondary indexes of a packed collection file.
+    """
+
+    def __init__(self, path: Path, index_fields: List[Tuple[str, ...]]):
+        self.path = path
+        self.index_fields = index_fields
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.indexes: Optional[Dict[Tuple[str, ...], HashIndex]] = None
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.inode: Optional[int] = None
+        self.size = 0
+        self.mm: Optional[mmap.mmap] = None
+
+    def _reset(self):
+        if self.mm is not None:
+            self.mm.close()
+        self.offsets = {}
+        self.indexes = None
+        self.live_bytes = self.dead_bytes = self.size = 0
+        self.inode = None
+        self.mm = None
+
+    def sync(self):
+        """
+        Scans the lines appended to the file since the last call. The whole
+        file is scanned again if it was replaced (e.g. compacted).
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if stat.st_ino != self.inode or stat.st_size < self.size:
+            self._reset()
+            self.inode = stat.st_ino
+
+        if stat.st_size == self.size:
+            return
+
+        if self.mm is not None:
+            self.mm.close()
+        with open(self.path, "rb") as packed_file:
+            self.mm = mmap.mmap(packed_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        start, end = self.size, len(self.mm)
+        while start < end:
+            stop = self.mm.find(b"\n", start, end)
+            if stop == -1:
+                # Incomplete line being written by someone else
+                break
+            self._apply(start, stop)
+            start = stop + 1
+        self.size = start
+
+    def _apply(self, start: int, stop: int):
+        line = self.mm[start:stop]
+        uuid = _line_uuid(line)
+        old = self.offsets.pop(uuid, None)
+
+        if old is not None:
+            self.live_bytes -= old[1] - old[0] + 1
+            self.dead_bytes += old[1] - old[0] + 1
+            if self.indexes is not None:
+                old_data = self.read(old)
+                for index in self.indexes.values():
+                    index.remove(uuid, old_data)
+
+        if line.endswith(DELETED_SUFFIX):
+            self.dead_bytes += stop - start + 1
+            return
+
+        self.offsets[uuid] = (start, stop)
+        self.live_bytes += stop - start + 1
+        if self.indexes is not None:
+            data = self.read((start, stop))
+            for index in self.indexes.values():
+                index.add(uuid, data)
+
+    def read(self, offset: Tuple[int, int]) -> dict:
+        return json.loads(self.mm[offset[0] : offset[1]])
+
+    def add_index(self, fields: Tuple[str, ...]):
+        if self.indexes is not None and fields not in self.indexes:
+            index = self.indexes[fields] = HashIndex(fields)
+            for uuid, offset in self.offsets.items():
+                index.add(uuid, self.read(offset))
+
+    def built_indexes(self) -> Dict[Tuple[str, ...], HashIndex]:
+        """
+        Returns the secondary indexes, that are built the first time they
+        are needed.
+        """
+        if self.indexes is None:
+            self.indexes = {fields: HashIndex(fields) for fields in self.index_fields}
+            if self.indexes:
+                for uuid, offset in self.offsets.items():
+                    data = self.read(offset)
+                    for index in self.indexes.values():
+                        index.add(uuid, data)
+        return self.indexes
+
+    def candidates(self, query: dict) -> List[str]:
+        """
+        Returns the uuids of the documents that may match the query.
+        """
+        uuids = candidates(self.built_indexes().values(), query)
+        return list(self.offsets if uuids is None else uuids)
+
+    def find(self, query: dict) -> List[dict]:
+        docs = (self.read(self.offsets[uuid]) for uuid in self.candidates(query))
+        return [data for data in docs if matches(data, query)]
+
+    def live_lines(self) -> List[bytes]:
+        return [self.mm[start:stop] for start, stop in self.offsets.values()]
+
+
+class PackedDBClient(DBClient):
+    def __init__(self, data_path: Path):
+        super().__init__()
+        self.data_path = data_path
+        self._collections: Dict[str, PackedCollection] = {}
+        self._index_fields: Dict[str, List[Tuple[str, ...]]] = {}
+        self._unique_fields: Dict[str, List[Tuple[str, ...]]] = {}
+        self._compacting = set()
+        self._lock = threading.RLock()
+
+    def _path(self, coll_name: str) -> Path:
+        return self.data_path / (coll_name + ".jsonl")
+
+    @contextmanager
+    def _file_lock(self, coll_name: str):
+        """
+        Locks the collection file against the writes of other processes. The
+        lock is taken on a separate file, as compactions replace the
+        collection file.
+        """
+        path = self._path(coll_name).with_suffix(".jsonl.lock")
+        path.parent.mkdir(exist_ok=True, parents=True)
+        with path.open("a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _collection(self, coll_name: str) -> PackedCollection:
+        with self._lock:
+            coll = self._collections.get(coll_name)
+            if coll is None:
+                coll = self._collections[coll_name] = PackedCollection(
+                    self._path(coll_name), self._index_fields.setdefault(coll_name, [])
+                )
+            coll.sync()
+            return coll
+
+    def _append(
+        self, coll_name: str, lines: List[bytes], docs: Optional[List[dict]] = None
+    ):
+        """
+        Appends lines to a collection file. The unique indexes are checked
+        for the `docs` being saved, if any, while the file is locked, so no
+        other session or process can store the same key in between.
+        """
+        path = self._path(coll_name)
+        path.parent.mkdir(exist_ok=True, parents=True)
+
+        with self._lock:
+            with self._file_lock(coll_name), path.open("ab") as packed_file:
+                if docs:
+                    self._check_unique(coll_name, docs)
+                # Taken under the file lock, so no other write can fall in
+                # between them
+                before = self.version(coll_name)
+                packed_file.write(b"".join(line + b"\n" for line in lines))
+                packed_file.flush()
+                self._record_write(coll_name, before, self.version(coll_name))
+
+            coll = self._collection(coll_name)
+            if (
+                coll.dead_bytes > COMPACT_MIN_BYTES
+                and coll.dead_bytes > coll.live_bytes
+                and coll_name not in self._compacting
+            ):
+                self._compacting.add(coll_name)
+                threading.Thread(
+                    target=self.compact, args=(coll_name,), daemon=True
+                ).start()
+
+    def compact(self, coll_name: str):
+        """
+        Rewrites the collection file keeping only the current document lines.
+        """
+        with self._lock:
+            try:
+                with self._file_lock(coll_name):
+                    # Lines appended by other processes are read before
+                    # replacing the file
+                    coll = self._collection(coll_name)
+                    self._write(coll_name, coll.live_lines())
+                coll.sync()
+            finally:
+                self._compacting.discard(coll_name)
+
+    def _write(self, coll_name: str, lines: List[bytes]):
+        path = self._path(coll_name)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = path.with_suffix(f".jsonl.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as packed_file:
+            packed_file.write(b"".join(line + b"\n" for line in lines))
+        os.replace(tmp_path, path)
+
+    def version(self, coll_name: str) -> Hashable:
+        """
+        The version of a collection is given by the inode and size of its
+        file, which change with every append or compaction.
+        """
+        try:
+            stat = os.stat(self._path(coll_name))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _check_unique(self, coll_name: str, docs: List[dict]):
+        unique_fields = self._unique_fields.get(coll_name)
+        if unique_fields:
+            indexes = self._collection(coll_name).built_indexes()
+            check_unique([indexes[fields] for fields in unique_fields], docs)
+
+    def save(self, coll_name: str, data: dict, fields: Optional[List[str]] = None):
+        self.save_many(coll_name, [data])
+
+    def save_many(self, coll_name: str, docs: List[dict]):
+        if not docs:
+            return
+        self._append(coll_name, [_encode(data) for data in docs], docs)
+
+    def get(self, coll_name: str, uuid: str) -> dict:
+        with self._lock:
+            coll = self._collection(coll_name)
+            offset = coll.offsets.get(uuid)
+            if offset is None:
+                raise Exception(f"Entry {uuid} not found in {coll_name}")
+            return coll.read(offset)
+
+    def get_many(self, coll_name: str, uuids: List[str]) -> List[dict]:
+        with self._lock:
+            coll = self._collection(coll_name)
+            offsets = (coll.offsets.get(uuid) for uuid in uuids)
+            return [coll.read(offset) for offset in offsets if offset is not None]
+
+    def delete(self, coll_name: str, uuid: str):
+        self._append(coll_name, [_tombstone(uuid)])
+
+    def delete_many(self, coll_name: str, uuids: List[str]):
+        if uuids:
+            self._append(coll_name, [_tombstone(uuid) for uuid in uuids])
+
+    def create_index(self, coll_name: str, fields: List[str], unique: bool = False):
+        """
+        An unique index over duplicated values is not enforced and
+        `DuplicateKeyError` is raised. It is enforced from the first call
+        after the duplicates are fixed.
+        """
+        if fields == ["uuid"]:
+            # Documents are already stored by uuid
+            return
+
+        with self._lock:
+            index_fields = self._index_fields.setdefault(coll_name, [])
+            if tuple(fields) not in index_fields:
+                index_fields.append(tuple(fields))
+            coll = self._collections.get(coll_name)
+            if coll is not None:
+                coll.add_index(tuple(fields))
+
+            unique_fields = self._unique_fields.setdefault(coll_name, [])
+            if tuple(fields) in unique_fields:
+                unique_fields.remove(tuple(fields))
+            if unique:
+                indexes = self._collection(coll_name).built_indexes()
+                if has_duplicates(indexes[tuple(fields)]):
+                    raise DuplicateKeyError(
+                        f"Duplicated {fields} values in {coll_name}"
+                    )
+                unique_fields.append(tuple(fields))
+
+    def index_stats(self, coll_name: str) -> List[dict]:
+        with self._lock:
+            indexes = self._collection(coll_name).indexes or {}
+            return [
+                {
+                    "fields": list(fields),
+                    "accesses": indexes[fields].probes if fields in indexes else 0,
+                }
+                for fields in self._index_fields.get(coll_name, [])
+            ]
+
+    def find(self, coll_name: str, **kwargs) -> List[dict]:
+        with self._lock:
+            return self._collection(coll_name).find(kwargs)
+
+    def iter(
+        self, coll_name: str, batch_size: int = 100, **kwargs
+    ) -> Iterator[List[dict]]:
+        with self._lock:
+            uuids = self._collection(coll_name).candidates(kwargs)
+
+        for i in range(0, len(uuids), batch_size):
+            # Offsets are resolved again for every batch, the file may have
+            # been compacted in between
+            with self._lock:
+                coll = self._collection(coll_name)
+                offsets = (coll.offsets.get(uuid) for uuid in uuids[i : i + batch_size])
+                docs = (coll.read(offset) for offset in offsets if offset is not None)
+                batch = [data for data in docs if matches(data, kwargs)]
+            if batch:
+                yield batch
+
+    def find_one(self, coll_name: str, **kwargs) -> dict:
+        for data in self.find(coll_name, **kwargs):
+            return data
+        raise KeyError(str(kwargs))
+
+    def all(self, coll_name: str) -> List[dict]:
+        with self._lock:
+            coll = self._collection(coll_name)
+            return [coll.read(offset) for offset in coll.offsets.values()]
+
+    def stats(self, coll_name: str) -> dict:
+        with self._lock:
+            coll = self._collection(coll_name)
+            return {"count": len(coll.offsets), "size": coll.size, "engine": "json"}
+
+    def import_yaml(self, yaml_path: Path):
+        """
+        Replaces the packed collections by the ones in a per-file YAML tree.
+        """
+        yaml_client = YamlDBClient(yaml_path)
+        for coll_path in sorted(yaml_path.iterdir()):
+            if not coll_path.is_dir() or not any(coll_path.glob("*.yaml")):
+                continue
+            docs = yaml_client.all(coll_path.name)
+            with self._lock:
+                with self._file_lock(coll_path.name):
+                    self._write(coll_path.name, [_encode(data) for data in docs])
+                self._collection(coll_path.name)
+
+    def export_yaml(self, yaml_path: Path):
+        """
+        Writes the packed collections as a per-file YAML tree, removing the
+        files of the documents that no longer exist.
+        """
+        yaml_client = YamlDBClient(yaml_path)
+        for path in sorted(self.data_path.glob("*.jsonl")):
+            coll_name = path.stem
+            docs = self.all(coll_name)
+            yaml_client.save_many(coll_name, docs)
+
+            uuids = {data["uuid"] for data in docs}
+            yaml_client.delete_many(
+                coll_name,
+                [
+                    data["uuid"]
+                    for data in yaml_client.all(coll_name)
+                    if data["uuid"] not in uuids
+                ],
+            )
@@ -0,0 +1,225 @@
+"""
+In-memory evaluation of queries for the clients that keep their documents
+in memory (e.g. the YAML client).
+
+Queries follow the MongoDB semantics, so the same `find` call gives the same
+result on every client: a scalar value matches a field that is equal to it or
+a list field that contains it.
+
+Instead of a value, a field can be given a dict of operators, all of which
+must hold (e.g. `year={"$gte": 2020, "$lt": 2023}`):
+
+- `$eq`, `$ne`: equal or not equal to the value.
+- `$in`, `$nin`: equal or not equal to any of the values of a list.
+- `$gt`, `$gte`, `$lt`, `$lte`: comparisons.
+- `$contains`: the (list) field contains the value, or all the values if a
+  list is given.
+
+As in MongoDB, an operator matches a list field if any of its elements does.
+"""
+
+import operator
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from models.db_clients.db_client import DuplicateKeyError
+
+COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+OPERATORS = {"$eq", "$ne", "$in", "$nin", "$contains", *COMPARISONS}
+
+
+def _hashable(value: Any) -> Hashable:
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+def is_operator(value: Any) -> bool:
+    return (
+        isinstance(value, dict)
+        and bool(value)
+        and all(key in OPERATORS for key in value)
+    )
+
+
+def _compare(compare: Callable[[Any, Any], bool], doc_value: Any, value: Any) -> bool:
+    try:
+        return compare(doc_value, value)
+    except TypeError:
+        # Values of different types never match, as in MongoDB
+        return False
+
+
+def _match_operator(doc_value: Any, op: str, value: Any) -> bool:
+    if op == "$eq":
+        return match_value(doc_value, value)
+    if op == "$ne":
+        return not match_value(doc_value, value)
+    if op == "$in":
+        return any(match_value(doc_value, v) for v in value)
+    if op == "$nin":
+        return not any(match_value(doc_value, v) for v in value)
+    if op == "$contains":
+        values = value if isinstance(value, list) else [value]
+        return isinstance(doc_value, list) and all(v in doc_value for v in values)
+
+    compare = COMPARISONS[op]
+    if isinstance(doc_value, list):
+        return any(_compare(compare, v, value) for v in doc_value)
+    return _compare(compare, doc_value, value)
+
+
+def match_value(doc_value: Any, value: Any) -> bool:
+    if is_operator(value):
+        return all(_match_operator(doc_value, op, v) for op, v in value.items())
+    if isinstance(doc_value, list) and not isinstance(value, list):
+        return value in doc_value
+    return doc_value == value
+
+
+def matches(doc: dict, query: Dict[str, Any]) -> bool:
+    return all(match_value(doc.get(key), value) for key, value in query.items())
+
+
+class HashIndex:
+    """
+    Maps the values of one or more fields to the uuids of the documents that
+    have them.
+
+    Single field indexes over list fields (e.g. `Person.emails`) index every
+    element of the list, so they can answer membership queries. Compound
+    indexes store lists as a whole.
+    """
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self.entries: Dict[Hashable, Set[str]] = {}
+        self.probes = 0
+
+    def _keys(self, doc: dict) -> Iterable[Hashable]:
+        if len(self.fields) == 1:
+            value = doc.get(self.fields[0])
+            if isinstance(value, list):
+                return {_hashable(v) for v in value}
+            return (_hashable(value),)
+        return (tuple(_hashable(doc.get(field)) for field in self.fields),)
+
+    def add(self, uuid: str, doc: dict):
+        for key in self._keys(doc):
+            self.entries.setdefault(key, set()).add(uuid)
+
+    def remove(self, uuid: str, doc: dict):
+        for key in self._keys(doc):
+            uuids = self.entries.get(key)
+            if uuids is not None:
+                uuids.discard(uuid)
+                if not uuids:
+                    del self.entries[key]
+
+    def can_answer(self, query: Dict[str, Any]) -> bool:
+        # Exact matches of whole lists are left to the full scan, and so are
+        # the negations, which match the documents without the field too
+        if len(self.fields) == 1 and self.fields[0] in query:
+            value = query[self.fields[0]]
+            if is_operator(value):
+                return not value.keys() & {"$ne", "$nin"} and not any(
+                    isinstance(v, list)
+                    for v in [value.get("$eq"), *value.get("$in", [])]
+                )
+            return not isinstance(value, list)
+
+        return all(
+            field in query
+            and not isinstance(query[field], list)
+            and not is_operator(query[field])
+            for field in self.fields
+        )
+
+    def _lookup_operator(self, op: str, value: Any) -> Set[str]:
+        if op == "$eq":
+            return self.entries.get(_hashable(value), set())
+        if op == "$in":
+            return set().union(*(self.entries.get(_hashable(v), ()) for v in value))
+        if op == "$contains":
+            values = value if isinstance(value, list) else [value]
+            uuids = [self.entries.get(_hashable(v), set()) for v in values]
+            return set.intersection(*uuids) if uuids else set()
+
+        # Ranges scan the distinct values instead of the documents
+        compare = COMPARISONS[op]
+        return set().union(
+            *(
+                uuids
+                for key, uuids in self.entries.items()
+                if _compare(compare, key, value)
+            )
+        )
+
+    def lookup(self, query: Dict[str, Any]) -> Set[str]:
+        """
+        Returns a superset of the uuids of the documents that match the query
+        in the fields of the index.
+        """
+        self.probes += 1
+        if len(self.fields) > 1:
+            key = tuple(_hashable(query[field]) for field in self.fields)
+            return self.entries.get(key, set())
+
+        value = query[self.fields[0]]
+        if not is_operator(value):
+            return self.entries.get(_hashable(value), set())
+
+        # Every operator may be matched by a different element of a list, so
+        # they are looked up independently
+        ops = iter(value.items())
+        uuids = set(self._lookup_operator(*next(ops)))
+        for op, op_value in ops:
+            uuids &= self._lookup_operator(op, op_value)
+        return uuids
+
+
+def candidates(
+    indexes: Iterable[HashIndex], query: Dict[str, Any]
+) -> Optional[Set[str]]:
+    """
+    Returns the uuids of the documents that may match the query using the
+    index that covers more of its fields, or None if no index can be used.
+    """
+    usable: List[HashIndex] = [idx for idx in indexes if idx.can_answer(query)]
+    if not usable:
+        return None
+    index = max(usable, key=lambda idx: len(idx.fields))
+    return index.lookup(query)
+
+
+def check_unique(indexes: Iterable[HashIndex], docs: List[dict]):
+    """
+    Raises `DuplicateKeyError` if saving the documents would leave two
+    documents with the same values in any of the given (unique) indexes.
+    """
+    uuids = {str(doc["uuid"]) for doc in docs}
+    for index in indexes:
+        # Documents of the batch replace their stored versions
+        taken: Dict[Hashable, str] = {}
+        for doc in docs:
+            uuid = str(doc["uuid"])
+            for key in index._keys(doc):
+                owner = taken.setdefault(key, uuid)
+                if owner != uuid or index.entries.get(key, set()) - uuids:
+                    raise DuplicateKeyError(
+                        f"Duplicated {list(index.fields)} values: {key}"
+                    )
+
+
+def has_duplicates(index: HashIndex) -> bool:
+    """
+    Returns True if two documents have the same values in the index.
+    """
+    return any(len(uuids) > 1 for uuids in index.entries.values())
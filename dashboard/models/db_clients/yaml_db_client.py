@@ -1,55 +1,458 @@
+import atexit
+import fcntl
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
 
 import yaml
-from models.db_clients.db_client import DBClient
+from models.db_clients.db_client import DBClient, DuplicateKeyError
+from models.db_clients.query import (
+    HashIndex,
+    candidates,
+    check_unique,
+    has_duplicates,
+    matches,
+)
+from yaml_parse import parse_files
+
+# Use the libyaml bindings when PyYAML was built with them, they parse and
+# emit several times faster than the pure Python implementation.
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+# Loads that need to parse at least this many files are split among a pool
+# of processes. Threads would not help, the YAML parser holds the GIL. Starting
+# the workers costs about as much as parsing a couple thousand files with the
+# pure Python loader.
+PARALLEL_MIN_FILES = 2048
+
+# Most processes in the pool
+MAX_WORKERS = 4
+
+# Directory, inside the data path, of the write counter file of every
+# collection (see `YamlDBClient.version`)
+VERSIONS_DIR = ".versions"
+
+
+class CollectionCache:
+    """
+    Parsed documents of a collection directory.
+
+    Every document is stored along with the (mtime, size) signature of the
+    file it was parsed from, so only the files that were added, changed or
+    deleted since the last read need to be parsed again. The secondary
+    indexes of the collection are kept in sync with the documents.
+    """
+
+    def __init__(self, index_fields: List[Tuple[str, ...]]):
+        self.dir_mtime: int = -1
+        self.docs: Dict[str, dict] = {}
+        self.signatures: Dict[str, Tuple[int, int]] = {}
+        self.indexes: Dict[Tuple[str, ...], HashIndex] = {}
+        for fields in index_fields:
+            self.add_index(fields)
+
+    def add_index(self, fields: Tuple[str, ...]):
+        if fields in self.indexes:
+            return
+        index = self.indexes[fields] = HashIndex(fields)
+        for uuid, data in self.docs.items():
+            index.add(uuid, data)
+
+    def put(self, uuid: str, data: dict, signature: Tuple[int, int]):
+        self.pop(uuid)
+        self.docs[uuid] = data
+        self.signatures[uuid] = signature
+        for index in self.indexes.values():
+            index.add(uuid, data)
+
+    def pop(self, uuid: str):
+        data = self.docs.pop(uuid, None)
+        self.signatures.pop(uuid, None)
+        if data is not None:
+            for index in self.indexes.values():
+                index.remove(uuid, data)
+
+    def find(self, query: dict) -> List[dict]:
+        uuids = candidates(self.indexes.values(), query)
+        docs = self.docs.values() if uuids is None else map(self.docs.get, uuids)
+        return [data for data in docs if matches(data, query)]
+
+
+def _signature(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _read_counter(path: Path) -> int:
+    try:
+        return int(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _default_workers(loader) -> int:
+    if loader is getattr(yaml, "CSafeLoader", None):
+        # libyaml parses the whole tree in less time than it takes to start
+        # the workers
+        return 1
+    return min(os.cpu_count() or 1, MAX_WORKERS)
 
 
 class YamlDBClient(DBClient):
-    def __init__(self, data_path: Path):
+    def __init__(
+        self,
+        data_path: Path,
+        loader=SafeLoader,
+        dumper=SafeDumper,
+        workers: Optional[int] = None,
+    ):
+        super().__init__()
         self.data_path = data_path
+        self.loader = loader
+        self.dumper = dumper
+        self.workers = _default_workers(loader) if workers is None else workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._caches: Dict[str, CollectionCache] = {}
+        self._index_fields: Dict[str, List[Tuple[str, ...]]] = {}
+        self._unique_fields: Dict[str, List[Tuple[str, ...]]] = {}
+        self._lock = threading.RLock()
 
-    def save(self, coll_name: str, data: dict):
-        path: Path = self.data_path / coll_name / (str(data["uuid"]) + ".yaml")
-        path.parent.mkdir(exist_ok=True, parents=True)
+    def _new_cache(self, coll_name: str) -> CollectionCache:
+        cache = CollectionCache(self._index_fields.get(coll_name, []))
+        self._caches[coll_name] = cache
+        return cache
+
+    def _cache(self, coll_name: str) -> CollectionCache:
+        cache = self._caches.get(coll_name)
+        return self._new_cache(coll_name) if cache is None else cache
+
+    def _parse_many(self, paths: List[str]) -> List[dict]:
+        if self.workers < 2 or len(paths) < PARALLEL_MIN_FILES:
+            return parse_files(paths, self.loader)
+
+        if self._pool is None:
+            # Forking the multi-threaded server could copy locks held by other
+            # threads into the workers, they are started from a clean process
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+            atexit.register(self._pool.shutdown)
+
+        size = -(-len(paths) // (self.workers * 4))
+        chunks = [paths[i : i + size] for i in range(0, len(paths), size)]
+        try:
+            results = self._pool.map(parse_files, chunks, [self.loader] * len(chunks))
+            return [data for chunk in results for data in chunk]
+        except BrokenProcessPool:
+            self.close()
+            return parse_files(paths, self.loader)
+
+    def close(self):
+        """
+        Stops the worker processes, if they were started.
+        """
+        with self._lock:
+            if self._pool is not None:
+                atexit.unregister(self._pool.shutdown)
+                self._pool.shutdown()
+                self._pool = None
+
+    def _changed_files(
+        self, coll_name: str
+    ) -> Tuple[CollectionCache, int, List[Tuple[str, str, Tuple[int, int]]]]:
+        """
+        Returns the cache of a collection, the current mtime of its directory
+        and the files that changed since they were cached. The documents of
+        the removed files are dropped from the cache.
+        """
+        path: Path = self.data_path / coll_name
+        cache = self._cache(coll_name)
+
+        try:
+            dir_mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self._new_cache(coll_name), -1, []
+
+        changed = []
+
+        if dir_mtime == cache.dir_mtime:
+            # No file was added or removed, only check the known ones
+            for uuid in list(cache.docs):
+                file_path = str(path / (uuid + ".yaml"))
+                try:
+                    signature = _signature(os.stat(file_path))
+                except FileNotFoundError:
+                    cache.pop(uuid)
+                    continue
+                if cache.signatures[uuid] != signature:
+                    changed.append((uuid, file_path, signature))
+            return cache, dir_mtime, changed
+
+        seen = set()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".yaml"):
+                    continue
+                uuid = entry.name[:-5]
+                seen.add(uuid)
+                signature = _signature(entry.stat())
+                if cache.signatures.get(uuid) != signature:
+                    changed.append((uuid, entry.path, signature))
+
+        for uuid in cache.docs.keys() - seen:
+            cache.pop(uuid)
 
-        with path.open("w") as data_file:
-            yaml_data = yaml.dump(data, allow_unicode=True)
-            data_file.write(yaml_data)
+        return cache, dir_mtime, changed
+
+    def _collections(self, coll_names: List[str]) -> Dict[str, CollectionCache]:
+        """
+        Returns the caches of the given collections after bringing them up to
+        date with the files on disk. The changed files of all the collections
+        are parsed together.
+        """
+        with self._lock:
+            scans = {
+                coll_name: self._changed_files(coll_name) for coll_name in coll_names
+            }
+            changed = [
+                (cache, uuid, signature)
+                for cache, _, files in scans.values()
+                for uuid, _, signature in files
+            ]
+            docs = self._parse_many(
+                [path for _, _, files in scans.values() for _, path, _ in files]
+            )
+
+            for (cache, uuid, signature), data in zip(changed, docs):
+                cache.put(uuid, data, signature)
+            for cache, dir_mtime, _ in scans.values():
+                cache.dir_mtime = dir_mtime
+
+            return {coll_name: scan[0] for coll_name, scan in scans.items()}
+
+    def _collection(self, coll_name: str) -> CollectionCache:
+        return self._collections([coll_name])[coll_name]
+
+    def save(self, coll_name: str, data: dict, fields: Optional[List[str]] = None):
+        self.save_many(coll_name, [data])
+
+    def save_many(self, coll_name: str, docs: List[dict]):
+        path: Path = self.data_path / coll_name
+        path.mkdir(exist_ok=True, parents=True)
+
+        with self._lock, self._file_lock(coll_name):
+            unique_fields = self._unique_fields.get(coll_name)
+            if unique_fields:
+                # Checked against the files on disk while the collection is
+                # locked, so no other session or process can store the same
+                # key in between
+                indexes = self._collection(coll_name).indexes
+                check_unique([indexes[fields] for fields in unique_fields], docs)
+
+            with self._writing(coll_name):
+                cache = self._caches.get(coll_name)
+                for data in docs:
+                    file_path = path / (str(data["uuid"]) + ".yaml")
+                    # Written aside and moved in place, so other processes
+                    # never read a half written file
+                    tmp_path = path / f".{data['uuid']}.{os.getpid()}.tmp"
+                    with tmp_path.open("w") as data_file:
+                        yaml_data = yaml.dump(
+                            data, Dumper=self.dumper, allow_unicode=True
+                        )
+                        data_file.write(yaml_data)
+                    os.replace(tmp_path, file_path)
+
+                    if cache is not None:
+                        signature = _signature(file_path.stat())
+                        cache.put(str(data["uuid"]), dict(data), signature)
 
     def get(self, coll_name: str, uuid: str) -> dict:
-        path: Path = self.data_path / coll_name / (uuid + ".yaml")
+        docs = self.get_many(coll_name, [uuid])
+        if not docs:
+            raise FileNotFoundError(str(self.data_path / coll_name / (uuid + ".yaml")))
+        return docs[0]
+
+    def get_many(self, coll_name: str, uuids: List[str]) -> List[dict]:
+        path: Path = self.data_path / coll_name
+
+        with self._lock:
+            cache = self._cache(coll_name)
+            changed = []
+            for uuid in uuids:
+                file_path = str(path / (uuid + ".yaml"))
+                try:
+                    signature = _signature(os.stat(file_path))
+                except FileNotFoundError:
+                    cache.pop(uuid)
+                    continue
+                if cache.signatures.get(uuid) != signature:
+                    changed.append((uuid, file_path, signature))
 
-        with path.open() as data_file:
-            return yaml.safe_load(data_file)
+            docs = self._parse_many([file_path for _, file_path, _ in changed])
+            for (uuid, _, signature), data in zip(changed, docs):
+                cache.put(uuid, data, signature)
+
+            return [dict(cache.docs[uuid]) for uuid in uuids if uuid in cache.docs]
 
     def delete(self, coll_name: str, uuid: str):
         path: Path = self.data_path / coll_name / (uuid + ".yaml")
-        path.unlink()
+
+        with self._lock, self._file_lock(coll_name), self._writing(coll_name):
+            path.unlink()
+            cache = self._caches.get(coll_name)
+            if cache is not None:
+                cache.pop(uuid)
+
+    def delete_many(self, coll_name: str, uuids: List[str]):
+        path: Path = self.data_path / coll_name
+
+        with self._lock, self._file_lock(coll_name), self._writing(coll_name):
+            cache = self._caches.get(coll_name)
+            for uuid in uuids:
+                (path / (uuid + ".yaml")).unlink(missing_ok=True)
+                if cache is not None:
+                    cache.pop(uuid)
+
+    def _counter_path(self, coll_name: str) -> Path:
+        return self.data_path / VERSIONS_DIR / coll_name
+
+    def version(self, coll_name: str) -> Hashable:
+        """
+        The version of a collection is given by its write counter and by its
+        directory, which changes when files are added or removed (e.g. by
+        git). Files edited in place by other tools are not noticed until the
+        next write.
+        """
+        return (
+            _read_counter(self._counter_path(coll_name)),
+            _stamp(self.data_path / coll_name),
+        )
+
+    @contextmanager
+    def _file_lock(self, coll_name: str):
+        """
+        Locks a collection against the writes of other processes, through a
+        lock file next to its counter.
+        """
+        path = self._counter_path(coll_name).with_name(coll_name + ".lock")
+        path.parent.mkdir(exist_ok=True, parents=True)
+        with path.open("a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _writing(self, coll_name: str):
+        """
+        Context of every write to a collection, to be entered holding its file
+        lock. Increments the counter of the collection after the write.
+        """
+        dir_stamp = _stamp(self.data_path / coll_name)
+        try:
+            yield
+        finally:
+            path = self._counter_path(coll_name)
+            counter = _read_counter(path) + 1
+            tmp_path = path.with_name(f".{coll_name}.{os.getpid()}.tmp")
+            tmp_path.write_text(f"{counter}\n")
+            os.replace(tmp_path, path)
+
+            self._record_write(
+                coll_name,
+                (counter - 1, dir_stamp),
+                (counter, _stamp(self.data_path / coll_name)),
+            )
+
+    def create_index(self, coll_name: str, fields: List[str], unique: bool = False):
+        """
+        An unique index over duplicated values is not enforced and
+        `DuplicateKeyError` is raised. It is enforced from the first call
+        after the duplicates are fixed.
+        """
+        if fields == ["uuid"]:
+            # Documents are already stored by uuid
+            return
+
+        with self._lock:
+            index_fields = self._index_fields.setdefault(coll_name, [])
+            if tuple(fields) not in index_fields:
+                index_fields.append(tuple(fields))
+            self._cache(coll_name).add_index(tuple(fields))
+
+            unique_fields = self._unique_fields.setdefault(coll_name, [])
+            if tuple(fields) in unique_fields:
+                unique_fields.remove(tuple(fields))
+            if unique:
+                if has_duplicates(self._collection(coll_name).indexes[tuple(fields)]):
+                    raise DuplicateKeyError(
+                        f"Duplicated {fields} values in {coll_name}"
+                    )
+                unique_fields.append(tuple(fields))
+
+    def index_stats(self, coll_name: str) -> List[dict]:
+        with self._lock:
+            return [
+                {"fields": list(fields), "accesses": index.probes}
+                for fields, index in self._cache(coll_name).indexes.items()
+            ]
 
     def find(self, coll_name: str, **kwargs) -> List[dict]:
-        entries = []
-        for item in self.all(coll_name):
-            if all(getattr(item, k, None) == v for k, v in kwargs.items()):
-                entries.append(item)
-        return entries
+        with self._lock:
+            cache = self._collection(coll_name)
+            return [dict(data) for data in cache.find(kwargs)]
+
+    def iter(
+        self, coll_name: str, batch_size: int = 100, **kwargs
+    ) -> Iterator[List[dict]]:
+        # Only the cached documents are referenced, the copies are made by batch
+        with self._lock:
+            cache = self._collection(coll_name)
+            docs = cache.find(kwargs) if kwargs else list(cache.docs.values())
+
+        for i in range(0, len(docs), batch_size):
+            yield [dict(data) for data in docs[i : i + batch_size]]
 
     def find_one(self, coll_name: str, **kwargs) -> dict:
-        for item in self.all(coll_name):
-            if all(getattr(item, k, None) == v for k, v in kwargs.items()):
-                return item
+        with self._lock:
+            cache = self._collection(coll_name)
+            for data in cache.find(kwargs):
+                return dict(data)
         raise KeyError(str(kwargs))
 
     def all(self, coll_name: str) -> List[dict]:
-        path: Path = self.data_path / coll_name
-        items = []
+        with self._lock:
+            cache = self._collection(coll_name)
+            return [dict(data) for data in cache.docs.values()]
 
-        for fname in path.glob("*.yaml"):
-            with open(fname, encoding="utf-8") as data_file:
-                data = yaml.safe_load(data_file)
-                items.append(data)
+    def preload(self, coll_names: List[str]):
+        self._collections(coll_names)
 
-        return items
+    @property
+    def engine(self) -> str:
+        return "libyaml" if self.loader.__name__.startswith("C") else "python"
 
     def stats(self, coll_name: str) -> dict:
-        return {}
+        with self._lock:
+            cache = self._collection(coll_name)
+            size = sum(size for _, size in cache.signatures.values())
+            return {"count": len(cache.docs), "size": size, "engine": self.engine}
@@ -1,29 +1,54 @@
+import io
 import json
+import tempfile
+from typing import Iterator
 
 from models.custom_model import DB_CLIENT, collection_names
 
 
 class DBHandler:
     @staticmethod
-    def export_json() -> str:
-        json_data = {}
-        for model, coll_name in collection_names.items():
-            entry_list = []
-            all_entries = model.all()
-            for entry in all_entries:
-                entry_list.append(entry.encode())
-            json_data[coll_name] = entry_list
-        return json.dumps(json_data, ensure_ascii=True)
+    def export_json_chunks() -> Iterator[str]:
+        """
+        Streams the JSON export of the database, one entry at a time.
+        """
+        yield "{"
+        for i, (model, coll_name) in enumerate(collection_names.items()):
+            yield (", " if i else "") + json.dumps(coll_name) + ": ["
+            for j, entry in enumerate(model.iter()):
+                yield (", " if j else "") + json.dumps(entry.encode())
+            yield "]"
+        yield "}"
+
+    @staticmethod
+    def export_json_file() -> io.RawIOBase:
+        """
+        Writes the JSON export of the database to a temporary file as it is
+        streamed, and returns the file ready to be read.
+        """
+        export_file = tempfile.TemporaryFile(buffering=0)
+        writer = io.BufferedWriter(export_file)
+        for chunk in DBHandler.export_json_chunks():
+            writer.write(chunk.encode())
+        writer.flush()
+        writer.detach()
+        export_file.seek(0)
+        return export_file
 
     @staticmethod
     def import_json(json_data: dict):
+        models = {coll_name: model for model, coll_name in collection_names.items()}
         for coll_name, entries in json_data.items():
-            for entry in entries:
-                DB_CLIENT.save(coll_name, entry)
+            model = models.get(coll_name)
+            if model is not None:
+                # Imported entries are validated before being stored
+                entries = [
+                    model.load(entry, trusted=False).encode() for entry in entries
+                ]
+            DB_CLIENT.save_many(coll_name, entries)
 
     @staticmethod
     def drop_all():
-        for model, coll_name in collection_names.items():
-            all_entries = model.all()
-            for entry in all_entries:
-                DB_CLIENT.delete(coll_name, str(entry.uuid))
+        for coll_name in set(collection_names.values()):
+            uuids = [str(data["uuid"]) for data in DB_CLIENT.all(coll_name)]
+            DB_CLIENT.delete_many(coll_name, uuids)
@@ -1,9 +1,19 @@
 import enum
 from functools import reduce
-from typing import List
-
-from models.custom_model import CustomModel, Ref, RefList, collection_name, with_refs
+from typing import Dict, List, Optional, Tuple
+
+from models.custom_model import (
+    DB_CLIENT,
+    CustomModel,
+    Ref,
+    RefList,
+    collection_name,
+    indexed,
+    with_refs,
+)
 from models.data_models.person_model import Person
+from models.db_clients.db_client import DBClient
+from models.reference_index import CollectionIndex
 
 READ = 1
 WRITE = 2
@@ -19,13 +29,91 @@ PERMISSIONS_BY_NAME = {v: k for k, v in PERMISSIONS.items()}
 ALL_PERMISSIONS = reduce(lambda p1, p2: p1 | p2, PERMISSIONS.keys())
 
 
+class PermissionMatrix(CollectionIndex):
+    """
+    (person uuid, section) -> permission, for every stored permission (see
+    `CollectionIndex`).
+    """
+
+    def __init__(self, db_client: DBClient):
+        super().__init__(db_client)
+        self._matrix: Dict[Tuple[str, str], int] = {}
+        # Key and permission of every stored permission, by uuid
+        self._entries: Dict[str, Tuple[Tuple[str, str], int]] = {}
+
+    def _add(self, coll_name: str, data: dict):
+        key = (str(data["person"]), data["section"])
+        self._entries[str(data["uuid"])] = (key, data["permission"])
+        self._matrix.setdefault(key, data["permission"])
+
+    def _discard(self, coll_name: str, uuid: str):
+        entry = self._entries.pop(uuid, None)
+        if entry is None:
+            return
+        key = entry[0]
+        self._matrix.pop(key, None)
+        # Another permission of the same person and section takes its place
+        for other_key, permission in self._entries.values():
+            if other_key == key:
+                self._matrix[key] = permission
+                break
+
+    def _clear(self, coll_name: str):
+        self._matrix = {}
+        self._entries = {}
+
+    def get(self, person: str, section: str) -> Optional[int]:
+        with self._lock:
+            self._build(Permission.coll_name())
+            return self._matrix.get((person, section))
+
+    def of_person(self, person: str) -> Dict[str, int]:
+        """
+        Returns the permission of a person in every section that has one.
+        """
+        with self._lock:
+            self._build(Permission.coll_name())
+            return {
+                section: permission
+                for (uuid, section), permission in self._matrix.items()
+                if uuid == person
+            }
+
+
+# Permissions of every person in every section (see `Permission.of`)
+PERMISSION_MATRIX = PermissionMatrix(DB_CLIENT)
+
+
 @with_refs
+@indexed("section", "person")
 @collection_name("permissions")
 class Permission(CustomModel):
     section: str
     person: Ref[Person]
     permission: int
 
+    def save(self):
+        CustomModel.save(self)
+        PERMISSION_MATRIX.update(Permission.coll_name(), self.encode())
+
+    def delete(self):
+        CustomModel.delete(self)
+        PERMISSION_MATRIX.remove(Permission.coll_name(), str(self.uuid))
+
+    @staticmethod
+    def of(person: Person, section: str) -> Optional[int]:
+        """
+        Returns the permission of a person in a section, if it has one.
+        """
+        return PERMISSION_MATRIX.get(str(person.uuid), section)
+
+    @staticmethod
+    def of_person(person: Person) -> Dict[str, int]:
+        """
+        Returns the permission of a person in every section that has one.
+        """
+        return PERMISSION_MATRIX.of_person(str(person.uuid))
+
     @property
     def can_read(self):
         return Permission.has_read_perm(self.permission)
@@ -0,0 +1,173 @@
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from models.db_clients.db_client import CollectionVersions, DBClient
+
+# (collection, uuid, field) of an entry field that references another entry
+Reference = Tuple[str, str, str]
+
+
+class CollectionIndex:
+    """
+    Base of the in-memory indexes over the entries of some collections.
+
+    The entries of a collection are read from the database the first time
+    they are needed, and from then on the index is kept up to date with
+    `update` and `remove` on every save and delete. They are read again when
+    the collection is written by someone else (see `DBClient.version`).
+
+    Subclasses say how an entry is added to and discarded from the index,
+    and must hold `_lock` around `_build` and their lookups.
+    """
+
+    def __init__(self, db_client: DBClient):
+        self.db_client = db_client
+        self._versions = CollectionVersions(db_client)
+        self._lock = threading.RLock()
+
+    def _add(self, coll_name: str, data: dict):
+        raise NotImplementedError()
+
+    def _discard(self, coll_name: str, uuid: str):
+        raise NotImplementedError()
+
+    def _clear(self, coll_name: str):
+        raise NotImplementedError()
+
+    def _forget(self, coll_name: str):
+        self._clear(coll_name)
+        self._versions.forget(coll_name)
+
+    def _build(self, coll_name: str):
+        if self._versions.is_current(coll_name):
+            return
+        self._forget(coll_name)
+        self._versions.loading(coll_name)
+        for data in self.db_client.all(coll_name):
+            self._add(coll_name, data)
+
+    def update(self, coll_name: str, data: dict):
+        """
+        Replaces a saved entry.
+        """
+        with self._lock:
+            if self._versions.written(coll_name):
+                self._discard(coll_name, str(data["uuid"]))
+                self._add(coll_name, data)
+            else:
+                self._forget(coll_name)
+
+    def remove(self, coll_name: str, uuid: str):
+        """
+        Drops a deleted entry.
+        """
+        with self._lock:
+            if self._versions.written(coll_name):
+                self._discard(coll_name, uuid)
+            else:
+                self._forget(coll_name)
+
+
+class ReferenceIndex(CollectionIndex):
+    """
+    Reverse index of the Ref and RefList fields: uuid of an entry -> fields
+    of the entries that reference it.
+    """
+
+    def __init__(self, db_client: DBClient):
+        super().__init__(db_client)
+        self._refs: Dict[str, Set[Reference]] = {}
+        self._targets: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        # Position of every entry, so results keep the order of the collection
+        self._order: Dict[Tuple[str, str], int] = {}
+        # Ref fields of every collection
+        self._fields: Dict[str, Tuple[str, ...]] = {}
+
+    def _add(self, coll_name: str, data: dict):
+        uuid = str(data["uuid"])
+        targets = []
+        for field in self._fields[coll_name]:
+            value = data.get(field)
+            if value is None:
+                continue
+            for target in value if isinstance(value, list) else [value]:
+                targets.append((field, str(target)))
+                self._refs.setdefault(str(target), set()).add((coll_name, uuid, field))
+
+        self._targets[(coll_name, uuid)] = targets
+        self._order.setdefault((coll_name, uuid), len(self._order))
+
+    def _discard(self, coll_name: str, uuid: str):
+        for field, target in self._targets.pop((coll_name, uuid), []):
+            refs = self._refs.get(target)
+            if refs is not None:
+                refs.discard((coll_name, uuid, field))
+                if not refs:
+                    del self._refs[target]
+
+    def _clear(self, coll_name: str):
+        for key in [key for key in self._targets if key[0] == coll_name]:
+            self._discard(*key)
+        for key in [key for key in self._order if key[0] == coll_name]:
+            del self._order[key]
+
+    def update(self, coll_name: str, data: dict, fields: Iterable[str]):
+        """
+        Replaces the references of a saved entry.
+        """
+        with self._lock:
+            self._fields[coll_name] = tuple(fields)
+            super().update(coll_name, data)
+
+    def remove(self, coll_name: str, uuid: str):
+        """
+        Drops the references of a deleted entry.
+        """
+        with self._lock:
+            super().remove(coll_name, uuid)
+            self._order.pop((coll_name, uuid), None)
+
+    def referencing(
+        self,
+        coll_name: str,
+        all_fields: Iterable[str],
+        targets: Iterable[str],
+        fields: Iterable[str],
+    ) -> List[str]:
+        """
+        Returns the uuids of the entries of a collection that reference any of
+        the targets in any of the given fields. `all_fields` are the ref fields
+        of the collection, in case it must be read.
+        """
+        return self.referencing_many({coll_name: all_fields}, targets, fields)[
+            coll_name
+        ]
+
+    def referencing_many(
+        self,
+        collections: Dict[str, Iterable[str]],
+        targets: Iterable[str],
+        fields: Iterable[str],
+    ) -> Dict[str, List[str]]:
+        """
+        Like `referencing`, for several collections (name -> ref fields) at
+        once. The references of every target are visited a single time.
+        """
+        fields = set(fields)
+        with self._lock:
+            for coll_name, all_fields in collections.items():
+                self._fields[coll_name] = tuple(all_fields)
+                self._build(coll_name)
+
+            found: Dict[str, Set[str]] = {coll_name: set() for coll_name in collections}
+            for target in targets:
+                for coll_name, uuid, field in self._refs.get(target, ()):
+                    if coll_name in found and field in fields:
+                        found[coll_name].add(uuid)
+
+            return {
+                coll_name: sorted(
+                    uuids, key=lambda uuid: self._order[(coll_name, uuid)]
+                )
+                for coll_name, uuids in found.items()
+            }
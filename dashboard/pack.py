@@ -0,0 +1,25 @@
+import sys
+
+from models.custom_model import PACKED_DATA_PATH, USING_PACKED, YAML_DATA_PATH
+from models.db_clients.packed_db_client import PackedDBClient
+
+
+def pack():
+    print("Packing", YAML_DATA_PATH, "into", PACKED_DATA_PATH)
+    PackedDBClient(PACKED_DATA_PATH).import_yaml(YAML_DATA_PATH)
+
+
+def unpack():
+    if not USING_PACKED:
+        print("The packed storage is not in use (USE_PACKED), nothing to export")
+        return
+    print("Exporting", PACKED_DATA_PATH, "into", YAML_DATA_PATH)
+    PackedDBClient(PACKED_DATA_PATH).export_yaml(YAML_DATA_PATH)
+
+
+if __name__ == "__main__":
+    commands = {"pack": pack, "unpack": unpack}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print("Usage: python dashboard/pack.py [pack|unpack]")
+        sys.exit(1)
+    commands[sys.argv[1]]()
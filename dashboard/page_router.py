@@ -4,6 +4,7 @@ from typing import Callable, Dict, Iterator, List, Optional
 
 import auth
 import streamlit as st
+from models.custom_model import ensure_indexes, identity_scope
 from models.data_models.person_model import Person
 from models.permission import (
     ALL_PERMISSIONS,
@@ -57,7 +58,7 @@ def admin_subpage(router: PageRouter, **params):
     st.write("---")
     st.write("#### Añadir permiso adicional")
 
-    person = st.selectbox("Persona", Person.all())
+    person = st.selectbox("Persona", Person.all(view=True))
     selected = st.multiselect(
         "Permisos",
         list(PERMISSIONS.values()),
@@ -127,13 +128,22 @@ class Route:
         if auth.in_admin_session():
             return ALL_PERMISSIONS
 
-        permissions = Permission.find(
-            person=str(user.uuid),
-            section=f"{self.root}/{self.url}",
-        )
-        if not permissions:
-            return self.default_perms
-        return permissions[0].permission
+        permission = Permission.of(user, f"{self.root}/{self.url}")
+        return self.default_perms if permission is None else permission
+
+    def tree_permissions(self, user: Person) -> Dict[str, int]:
+        """
+        Returns the permission of the user in this route and all its
+        subroutes, by url.
+        """
+        if auth.in_admin_session():
+            return {route.url: ALL_PERMISSIONS for route in self.all_routes()}
+
+        permissions = Permission.of_person(user)
+        return {
+            route.url: permissions.get(f"{route.root}/{route.url}", route.default_perms)
+            for route in self.all_routes()
+        }
 
 
 class PageRouter:
@@ -143,6 +153,8 @@ class PageRouter:
         self.main_route._build_url(self.root_name)
 
         self.current_page = main_route
+        # Permissions of the logged user in every route, set on `start`
+        self.permissions: Dict[str, int] = {}
         self.routes: Dict[str, Route] = {}
         self.routes_by_name: Dict[str, Route] = {}
         for route in main_route.all_routes():
@@ -190,23 +202,33 @@ class PageRouter:
     def _access_error_page(self, url):
         st.title("No tienes permiso para acceder a esta página")
 
+    def _user_permission(self) -> int:
+        permission = self.permissions.get(self.current_page.url)
+        if permission is None:
+            permission = self.current_page.user_permission(auth.current_user_model())
+        return permission
+
     @property
     def user_can_write(self) -> bool:
         if auth.is_user_logged():
-            permission = self.current_page.user_permission(auth.current_user_model())
-            if Permission.has_write_perm(permission):
+            if Permission.has_write_perm(self._user_permission()):
                 return True
         return False
 
     @property
     def user_is_subadmin(self) -> bool:
         if auth.is_user_logged():
-            permission = self.current_page.user_permission(auth.current_user_model())
-            if Permission.has_admin_perm(permission):
+            if Permission.has_admin_perm(self._user_permission()):
                 return True
         return False
 
     def start(self):
+        ensure_indexes()
+        # Models read during the rerun are shared by the whole page
+        with identity_scope():
+            self._start()
+
+    def _start(self):
         # To detect change of base page
         current_root = st.session_state.get("root_page", None)
         if current_root is not None:
@@ -232,8 +254,9 @@ class PageRouter:
 
         # Check permission
         if auth.is_user_logged():
-            permission = route.user_permission(auth.current_user_model())
-            if not Permission.has_read_perm(permission):
+            user = auth.current_user_model()
+            self.permissions = self.main_route.tree_permissions(user)
+            if not Permission.has_read_perm(self.permissions[route.url]):
                 self._access_error_page(url)
                 return
         elif not Permission.has_read_perm(route.default_perms):
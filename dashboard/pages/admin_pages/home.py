@@ -5,7 +5,7 @@ import altair
 import auth
 import pandas as pd
 import streamlit as st
-from models.custom_model import collection_names
+from models.custom_model import collection_names, create_indexes, index_problems
 from models.db_handler import DBHandler
 from page_router import PageRouter
 
@@ -41,11 +41,15 @@ def admin_page(router: PageRouter, **params):
             total_entries = sum(stat["count"] for stat in stats.values())
 
             total_size = sum(stat["size"] for stat in stats.values())
+            engines = ", ".join(
+                sorted({stat["engine"] for stat in stats.values() if "engine" in stat})
+            )
             st.write(
                 f"""
                      - <font size=5>Cantidad de modelos:</font>  &nbsp;&nbsp;&nbsp;**<font size=5>{len(stats)}</font>**
                      - <font size=5>Cantidad de entradas:</font>  &nbsp;&nbsp;&nbsp;**<font size=5>{total_entries}</font>**
                      - <font size=5>Tamaño total:</font>  &nbsp;&nbsp;&nbsp;**<font size=5>{format_bytes(total_size)}</font>**
+                     - <font size=5>Motor de lectura:</font>  &nbsp;&nbsp;&nbsp;**<font size=5>{engines or "mongodb"}</font>**
             """,
                 unsafe_allow_html=True,
             )
@@ -59,13 +63,13 @@ def admin_page(router: PageRouter, **params):
             file_format = "json"
 
             if st.button(f"Convertir base de datos a {file_format}"):
-                data = DBHandler.export_json()
-                st.download_button(
-                    label="Descargar",
-                    file_name=f"dashoboard_database.{file_format}",
-                    data=data,
-                    mime=f"text/{file_format}",
-                )
+                with DBHandler.export_json_file() as data:
+                    st.download_button(
+                        label="Descargar",
+                        file_name=f"dashoboard_database.{file_format}",
+                        data=data,
+                        mime=f"text/{file_format}",
+                    )
 
         with tools_imp:
             st.title("&nbsp;")
@@ -145,3 +149,29 @@ def admin_page(router: PageRouter, **params):
                 ),
                 use_container_width=True,
             )
+
+        st.title("Índices")
+        for (coll_name, fields), reason in index_problems.items():
+            st.warning(
+                f"El índice **{', '.join(fields)}** de **{coll_name}** "
+                f"no se pudo crear como se declaró: {reason}"
+            )
+        if index_problems and st.button("🔁 Crear los índices de nuevo"):
+            create_indexes()
+            st.experimental_rerun()
+
+        index_usage = []
+        for model in collection_names.keys():
+            for stat in model.index_stats():
+                index_usage.append(
+                    {
+                        "Modelo": model.__name__,
+                        "Campos": ", ".join(stat["fields"]),
+                        "Consultas": stat["accesses"],
+                    }
+                )
+
+        if index_usage:
+            st.dataframe(pd.DataFrame(index_usage), use_container_width=True)
+        else:
+            st.write("No hay índices en la base de datos.")
@@ -5,7 +5,7 @@ from page_router import PageRouter
 
 
 def user_is_registered(email: str):
-    return Person.find(emails=email)
+    return Person.from_email(email) is not None
 
 
 def registration_page(router: PageRouter, token: str = None, **params):
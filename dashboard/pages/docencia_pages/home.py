@@ -41,7 +41,7 @@ def docencia_page(router: PageRouter, **params):
 
         subjects = []
 
-        for subject in sorted(Subject.all(), key=lambda s: (s.year, s.semester, s.subject)):
+        for subject in sorted(Subject.all(view=True), key=lambda s: (s.year, s.semester, s.subject)):
             subjects.append(subject.encode())
 
         st.dataframe(subjects)
@@ -53,7 +53,7 @@ def docencia_page(router: PageRouter, **params):
                 cols = st.columns([2, 2, 1, 1])
 
                 subject = cols[0].selectbox(
-                    "Asignatura", sorted(Subject.all(), key=lambda s: s.subject)
+                    "Asignatura", sorted(Subject.all(view=True), key=lambda s: s.subject)
                 )
                 professor = cols[1].selectbox(
                     "Profesor",
@@ -87,7 +87,9 @@ def docencia_page(router: PageRouter, **params):
 
         data = []
 
-        for entry in Classes.all():
+        all_classes = Classes.all(prefetch=["subject", "professor"])
+
+        for entry in all_classes:
             if entry.subject.semester != semester:
                 continue
 
@@ -12,8 +12,8 @@ def grupos_page(router: PageRouter, **params):
     list_view, create_view = st.tabs(["👥 Listado de grupos", "📝 Crear o editar"])
 
 
-    groups = ResearchGroup.all()
-    people = Person.all()
+    groups = ResearchGroup.all(view=True)
+    people = Person.all(view=True)
     people.sort(key=lambda p: p.name)
 
 
@@ -32,7 +32,7 @@ def grupos_page(router: PageRouter, **params):
                     "Seleccione un grupo a modificar",
                     sorted(groups, key=lambda t: t.name),
                     format_func=lambda t: t.name,
-                )
+                ).edit()
             else:
                 group = ResearchGroup(name="", members=[], collaborators=[], keywords=[])
 
@@ -11,7 +11,7 @@ def personal_page(router: PageRouter, **params):
     router.page_header("Personal")
     
 
-    people = Person.all()
+    people = Person.all(view=True)
     people.sort(key=lambda p: p.name)
 
     if auth.is_user_logged():
@@ -26,7 +26,7 @@ def personal_page(router: PageRouter, **params):
                     "Seleccione una entrada a modificar",
                     people,
                     format_func=lambda p: f"{p.name} ({p.institution})",
-                )
+                ).edit()
             else:
                 person = Person(
                     name="",
@@ -93,15 +93,16 @@ def personal_page(router: PageRouter, **params):
     people_uh = []
     people_extra = []
 
-    people = Person.all()
+    people = Person.all(view=True)
     people.sort(key=lambda s: s.name)
 
     st.write(f"#### 👥 Listado `{len(people)}`")
     for person in people:
         if person.institution != "Universidad de La Habana":
-            people_extra.append(person)
+            row = person.encode()
             if not person.institution:
-                person.academic_grade = "Ninguno"
+                row["academic_grade"] = "Ninguno"
+            people_extra.append(row)
 
             continue
 
@@ -139,4 +140,4 @@ def personal_page(router: PageRouter, **params):
         st.table([p.encode() for p in people_uh])
 
     with st.expander(f"Externos ({len(people_extra)})"):
-        st.table([p.encode() for p in people_extra])
+        st.table(people_extra)
@@ -45,7 +45,7 @@ def premios_page(router: PageRouter, **params):
 
 
     with list_view:
-        awards = Award.all()
+        awards = Award.all(view=True)
         awards.sort(key=lambda a: (-a.date.year, a.name))
 
         for award in awards:
@@ -14,12 +14,10 @@ def profile_page(router: PageRouter, **params):
 
     email = st.session_state.get("user", "angela@matcom.uh.cu")
 
-    persons = Person.find(emails=email)
-    if not persons:
+    person = Person.from_email(email)
+    if person is None:
         st.error("Tu cuenta no está registrada")
         st.stop()
-    
-    person = persons[0]
 
     c1, c2 = st.columns([1, 5])
     with c1:
@@ -53,7 +53,7 @@ def proyectos_page(router: PageRouter, **params):
             st.error("Acceso de solo lectura. Vaya a la página principal para loguearse.")
 
 
-    projects = Project.all()
+    projects = Project.all(view=True)
     projects.sort(key=lambda p: p.title)
 
 
@@ -11,13 +11,13 @@ def books_and_chapters_page(router, **params):
 
     year = st.sidebar.selectbox("Año", [2020, 2021, 2022], index=2)
 
-    people = Person.all()
+    people = Person.all(view=True)
     people.sort(key=lambda p: p.name)
 
-    books = [b for b in Book.all() if b.year == year]
+    books = Book.find(year=year)
     books.sort(key=lambda b: b.title)
 
-    chapters = [c for c in BookChapter.all() if c.year == year]
+    chapters = BookChapter.find(year=year)
     chapters.sort(key=lambda b: b.chapter)
 
     if auth.is_user_logged():
@@ -34,22 +34,22 @@ def home_page(router: PageRouter, **params):
 
     year = st.sidebar.selectbox("Año", [2020, 2021, 2022], index=2)
 
-    people = Person.all()
+    people = Person.all(view=True)
     people.sort(key=lambda p: p.name)
 
-    journals = Journal.all()
+    journals = Journal.all(view=True)
     journals.sort(key=lambda j: j.title)
 
-    papers = [p for p in JournalPaper.all() if p.year == year]
+    papers = JournalPaper.find(year=year, prefetch=["authors", "journal"])
     papers.sort(key=lambda p: p.title)
 
-    books = [b for b in Book.all() if b.year == year]
+    books = Book.find(year=year, prefetch=["authors"])
     books.sort(key=lambda b: b.title)
 
-    chapters = [c for c in BookChapter.all() if c.year == year]
+    chapters = BookChapter.find(year=year, prefetch=["authors"])
     chapters.sort(key=lambda b: b.chapter)
 
-    presentations = [p for p in ConferencePresentation.all() if p.year == year]
+    presentations = ConferencePresentation.find(year=year, prefetch=["authors"])
     presentations.sort(key=lambda p: p.title)
 
     publications = {
@@ -9,28 +9,25 @@ def journals_page(router: PageRouter, **params):
 
     year = st.sidebar.selectbox("Año", [2020, 2021, 2022], index=2)
 
-    journals = Journal.all()
+    journals = Journal.all(view=True)
     journals.sort(key=lambda j: j.title)
 
-    journals = Journal.all()
-    journals.sort(key=lambda j: j.title)
-
-    papers = [p for p in JournalPaper.all() if p.year == year]
+    papers = JournalPaper.find(year=year)
     papers.sort(key=lambda p: p.title)
 
-    books = [b for b in Book.all() if b.year == year]
+    books = Book.find(year=year)
     books.sort(key=lambda b: b.title)
 
-    chapters = [c for c in BookChapter.all() if c.year == year]
+    chapters = BookChapter.find(year=year)
     chapters.sort(key=lambda b: b.chapter)
 
-    presentations = [p for p in ConferencePresentation.all() if p.year == year]
+    presentations = ConferencePresentation.find(year=year)
     presentations.sort(key=lambda p: p.title)
 
     st.write(f"#### 🗞️ Revistas `{len(journals)}`")
 
     with st.expander("Editar revista"):
-        journal = st.selectbox("Revista", journals)
+        journal = st.selectbox("Revista", journals).edit()
 
         journal.title = st.text_input(
             "Título", key=f"journal_title_{journal.uuid}", value=journal.title
@@ -9,14 +9,16 @@ def papers_page(router: PageRouter, from_year=None, to_year=None, **params):
     router.page_header("📃 Artículos")
 
     # year = st.sidebar.selectbox("Año", [2020, 2021, 2022], index=2)
-    people = Person.all()
+    people = Person.all(view=True)
     people.sort(key=lambda p: p.name)
 
-    journals = Journal.all()
+    journals = Journal.all(view=True)
     journals.sort(key=lambda j: j.title)
 
     years = list(range(int(from_year or 2020), int(to_year or 2022) + 1))
-    papers = [p for p in JournalPaper.all() if p.year in years]
+    papers = JournalPaper.find(
+        year={"$in": years}, prefetch=["authors", "journal", "corresponding_author"]
+    )
     papers.sort(key=lambda p: p.title)
 
     if router.user_can_write:
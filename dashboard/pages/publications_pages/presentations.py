@@ -9,10 +9,10 @@ def presentations_page(router, **params):
 
     year = st.sidebar.selectbox("Año", [2020, 2021, 2022], index=2)
 
-    people = Person.all()
+    people = Person.all(view=True)
     people.sort(key=lambda p: p.name)
 
-    presentations = [p for p in ConferencePresentation.all() if p.year == year]
+    presentations = ConferencePresentation.find(year=year)
     presentations.sort(key=lambda p: p.title)
 
     if auth.is_user_logged():
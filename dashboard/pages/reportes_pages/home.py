@@ -24,7 +24,7 @@ def reportes_page(router: PageRouter, **params):
     people = Person.own()
     people.sort(key=lambda p: p.name)
 
-    groups = ResearchGroup.all()
+    groups = ResearchGroup.all(view=True)
     groups.sort(key=lambda g: g.name)
 
 
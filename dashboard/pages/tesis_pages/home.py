@@ -20,7 +20,7 @@ def tesis_page(router: PageRouter, **params):
 
     listing, create, details = st.tabs(["📃 Listado", "➕ Crear nueva Tesis", "📄 Detalles"])
 
-    theses: List[Thesis] = Thesis.all()
+    theses: List[Thesis] = Thesis.all(view=True)
 
     with listing:
         st.write("##### 🏷️ Filtros")
@@ -75,7 +75,7 @@ def tesis_page(router: PageRouter, **params):
                     "Seleccione una tesis a modificar",
                     sorted(theses, key=lambda t: t.title),
                     format_func=lambda t: f"{t.title} - {t.authors[0]}",
-                )
+                ).edit()
             else:
                 thesis = Thesis(title="", authors=[], advisors=[], keywords=[])
 
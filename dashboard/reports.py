@@ -10,11 +10,14 @@ from models import (
     BookChapter,
     Classes,
     ConferencePresentation,
+    Journal,
     JournalPaper,
     Person,
     Project,
+    Publication,
     ResearchGroup,
     Thesis,
+    preload,
 )
 
 
@@ -24,12 +27,14 @@ def _soft_bl(text: str) -> str:
 
 
 def _papers_by(persons: List[Person]) -> List[str]:
+    publications = Publication.by_authors(persons, prefetch=["authors", "journal"])
+
     lines = []
     total = 0
 
     articles = ""
     article_count = 0
-    for paper in JournalPaper.from_authors(persons):
+    for paper in publications[JournalPaper]:
         articles += f"- {paper.format()}\n\n"
         article_count += 1
 
@@ -37,7 +42,7 @@ def _papers_by(persons: List[Person]) -> List[str]:
 
     conferences = ""
     conf_count = 0
-    for paper in ConferencePresentation.from_authors(persons):
+    for paper in publications[ConferencePresentation]:
         conferences += f"- {paper.format()}\n\n"
         conf_count += 1
 
@@ -45,11 +50,11 @@ def _papers_by(persons: List[Person]) -> List[str]:
 
     books = ""
     book_counts = 0
-    for paper in Book.from_authors(persons):
+    for paper in publications[Book]:
         books += f"- {paper.format()}\n\n"
         book_counts += 1
 
-    for paper in BookChapter.from_authors(persons):
+    for paper in publications[BookChapter]:
         books += f"- {paper.format()}\n\n"
         book_counts += 1
 
@@ -236,20 +241,29 @@ def personal_report(
 
 
 def research_balance(start_date, end_date):
+    preload(
+        JournalPaper,
+        ConferencePresentation,
+        Book,
+        BookChapter,
+        Journal,
+        Project,
+        Person,
+        Award,
+    )
+
     lines = []
 
-    papers = [p for p in JournalPaper.all() if p.year == end_date.year]
+    papers = JournalPaper.find(year=end_date.year)
     papers.sort(key=lambda p: p.title)
 
-    presentations = [
-        p for p in ConferencePresentation.all() if p.year == end_date.year and p.paper
-    ]
+    presentations = ConferencePresentation.find(year=end_date.year, paper=True)
     presentations.sort(key=lambda p: p.title)
 
-    books = [p for p in Book.all() if p.year == end_date.year]
+    books = Book.find(year=end_date.year)
     books.sort(key=lambda b: b.title)
 
-    chapters = [p for p in BookChapter.all() if p.year == end_date.year]
+    chapters = BookChapter.find(year=end_date.year)
     chapters.sort(key=lambda b: b.title)
 
     wos_scopus = []
@@ -282,7 +296,7 @@ def research_balance(start_date, end_date):
                 colab.append(author)
                 break
 
-    events = [p for p in ConferencePresentation.all() if p.year == end_date.year]
+    events = ConferencePresentation.find(year=end_date.year)
     events.sort(key=lambda e: e.title)
 
     international_events = collections.defaultdict(list)
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+for name in ["DB_ROOT_USER", "DB_ROOT_PASS", "USE_MONGO"]:
+    os.environ.setdefault(name, "")
+
+from models.db_clients.db_client import DuplicateKeyError
+from models.db_clients.packed_db_client import PackedDBClient
+from models.db_clients.yaml_db_client import YamlDBClient
+
+FIELDS = ["subject", "professor"]
+
+
+class UniqueIndexOverDuplicates:
+    """
+    Unique indexes created over data that already has duplicated keys.
+    """
+
+    def new_client(self, path: Path):
+        raise NotImplementedError()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = self.new_client(Path(self.tmp.name))
+        self.client.save_many(
+            "classes",
+            [
+                {"uuid": "a", "subject": "s", "professor": "p", "year": 1},
+                {"uuid": "b", "subject": "s", "professor": "p", "year": 2},
+                {"uuid": "c", "subject": "s", "professor": "q", "year": 3},
+            ],
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_duplicates_are_reported(self):
+        with self.assertRaises(DuplicateKeyError):
+            self.client.create_index("classes", FIELDS, unique=True)
+
+    def test_duplicates_can_be_saved(self):
+        with self.assertRaises(DuplicateKeyError):
+            self.client.create_index("classes", FIELDS, unique=True)
+
+        self.client.save(
+            "classes", {"uuid": "a", "subject": "s", "professor": "p", "year": 4}
+        )
+        self.client.save(
+            "classes", {"uuid": "d", "subject": "s", "professor": "q", "year": 5}
+        )
+
+        self.assertEqual(self.client.find_one("classes", uuid="a")["year"], 4)
+        self.assertEqual(len(self.client.find("classes", subject="s")), 4)
+
+    def test_enforced_once_fixed(self):
+        with self.assertRaises(DuplicateKeyError):
+            self.client.create_index("classes", FIELDS, unique=True)
+
+        self.client.delete("classes", "b")
+        self.client.create_index("classes", FIELDS, unique=True)
+
+        with self.assertRaises(DuplicateKeyError):
+            self.client.save(
+                "classes", {"uuid": "d", "subject": "s", "professor": "p", "year": 5}
+            )
+
+
+class YamlUniqueIndexTest(UniqueIndexOverDuplicates, unittest.TestCase):
+    def new_client(self, path: Path):
+        return YamlDBClient(path)
+
+
+class PackedUniqueIndexTest(UniqueIndexOverDuplicates, unittest.TestCase):
+    def new_client(self, path: Path):
+        return PackedDBClient(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
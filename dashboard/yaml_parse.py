@@ -0,0 +1,19 @@
+"""
+Parsing of YAML data files in the worker processes of `YamlDBClient`.
+
+Workers import this module to run `parse_files`, so it must stay free of
+side effects and must not import `models`, which would load the whole
+package in every worker.
+"""
+
+from typing import List
+
+import yaml
+
+
+def parse_files(paths: List[str], loader) -> List[dict]:
+    docs = []
+    for path in paths:
+        with open(path, encoding="utf-8") as data_file:
+            docs.append(yaml.load(data_file, Loader=loader))
+    return docs